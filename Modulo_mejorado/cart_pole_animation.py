@@ -1,6 +1,8 @@
+import time
+
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.integrate import odeint
+from scipy.integrate import odeint, solve_ivp
 
 
 class CartPoleSystem:
@@ -31,28 +33,28 @@ class CartPoleSystem:
         # Umbral para cambio de control
         self.capture_threshold = 0.8  # Radianes, región más amplia de captura
 
+        # Saturación del actuador
+        self.force_limit = 20.0  # N
+
     def calculate_energy(self, theta, theta_dot):
         """Calcula la energía mecánica total del péndulo"""
         E_p = self.m * self.g * self.l * (np.cos(theta) - 1)
         E_k = 0.5 * self.m * (self.l * theta_dot) ** 2
         return E_p + E_k
 
-    def system_dynamics(self, state, t):
-        x, theta, x_dot, theta_dot = state
-
-        # Normalización del error angular
-        theta_error = (theta - self.theta_ref + np.pi) % (2 * np.pi) - np.pi
-
-        # Cálculo de energía
-        current_energy = self.calculate_energy(theta, theta_dot)
+    def normalize_angle_error(self, theta):
+        """Error angular respecto a la referencia, normalizado a [-pi, pi)"""
+        return (theta - self.theta_ref + np.pi) % (2 * np.pi) - np.pi
 
-        # Factor de proximidad al equilibrio usando una función suave
-        proximity = 0.5 * (1 + np.cos(theta_error))
+    def unsaturated_force(self, state, stabilizing):
+        """Fuerza de control antes de la saturación para la región indicada"""
+        x, theta, x_dot, theta_dot = state
+        theta_error = self.normalize_angle_error(theta)
 
-        # Decisión de control basada en la región
-        if abs(theta_error) < self.capture_threshold:
+        if stabilizing:
             # Región de estabilización
             # Control LQR-like con ganancias conservadoras
+            proximity = 0.5 * (1 + np.cos(theta_error))
             F = (-self.k_theta * theta_error
                  - self.k_theta_dot * theta_dot * (1 + 0.5 * np.cos(theta))  # Amortiguamiento no lineal
                  - self.k_x * x * (1 - 0.5 * abs(theta_error))  # Reducción de control de posición lejos del equilibrio
@@ -63,14 +65,21 @@ class CartPoleSystem:
         else:
             # Región de swing-up
             # Control de energía con modulación suave
-            energy_error = current_energy
+            energy_error = self.calculate_energy(theta, theta_dot)
             F = self.k_energy * energy_error * np.cos(theta) * theta_dot
 
             # Control mínimo de posición durante swing-up
             F += -0.1 * x - 0.2 * x_dot
 
-        # Limitación de fuerza más conservadora
-        F = np.clip(F, -20, 20)
+        return F
+
+    def plant_dynamics(self, state, F):
+        """Dinámica del carro-péndulo con amortiguamiento adaptativo para una fuerza dada"""
+        x, theta, x_dot, theta_dot = state
+        theta_error = self.normalize_angle_error(theta)
+
+        # Factor de proximidad al equilibrio usando una función suave
+        proximity = 0.5 * (1 + np.cos(theta_error))
 
         # Amortiguamiento adaptativo que aumenta cerca del equilibrio
         damping = self.base_damping + self.extra_damping * proximity
@@ -94,19 +103,155 @@ class CartPoleSystem:
 
         return [x_dot, theta_dot, x_ddot, theta_ddot]
 
-    def simulate(self, t_span, initial_state):
+    def system_dynamics(self, state, t):
+        # Decisión de control basada en la región
+        theta_error = self.normalize_angle_error(state[1])
+        F = self.unsaturated_force(state, abs(theta_error) < self.capture_threshold)
+
+        # Limitación de fuerza más conservadora
+        F = np.clip(F, -self.force_limit, self.force_limit)
+
+        return self.plant_dynamics(state, F)
+
+    def simulate(self, t_span, initial_state, dense=False):
+        # Trayectoria perezosa sobre la salida densa en lugar de la malla fija
+        # (requiere la raíz del repositorio en la ruta: python -m Modulo_mejorado.cart_pole_animation)
+        if dense:
+            from trajectory import integrate
+
+            trajectory = integrate(self.system_dynamics, t_span, initial_state, rtol=1e-8, atol=1e-8)
+            self.rhs_evaluations = trajectory.rhs_evaluations
+            return trajectory
+
         dt = 0.01
         n_points = int(t_span / dt) + 1
         t = np.linspace(0, t_span, n_points)
 
-        solution = odeint(self.system_dynamics,
-                          initial_state,
-                          t,
-                          rtol=1e-8,
-                          atol=1e-8)
+        solution, info = odeint(self.system_dynamics,
+                                initial_state,
+                                t,
+                                rtol=1e-8,
+                                atol=1e-8,
+                                full_output=True)
+
+        # Evaluaciones acumuladas del lado derecho reportadas por LSODA
+        self.rhs_evaluations = int(info['nfe'][-1])
 
         return t, solution
 
+    def _saturation_state(self, state, stabilizing):
+        """Estado de saturación (-1, 0, 1) de la fuerza en la región indicada"""
+        F = self.unsaturated_force(state, stabilizing)
+        if F > self.force_limit:
+            return 1
+        if F < -self.force_limit:
+            return -1
+        return 0
+
+    def _hybrid_events(self, stabilizing, saturation):
+        """Superficies de conmutación vigiladas en el modo actual.
+
+        Cada evento sólo se activa en la dirección que abandona el modo,
+        así el reinicio sobre la propia superficie no lo vuelve a disparar.
+        Las evaluaciones de eventos se cuentan en `event_evaluations`: las de
+        saturación cuestan lo mismo que una del lado derecho.
+        """
+        def capture(t, state):
+            self.event_evaluations += 1
+            return abs(self.normalize_angle_error(state[1])) - self.capture_threshold
+        capture.terminal = True
+        capture.direction = 1 if stabilizing else -1
+
+        def upper(t, state):
+            self.event_evaluations += 1
+            return self.unsaturated_force(state, stabilizing) - self.force_limit
+        upper.terminal = True
+        upper.direction = -1 if saturation == 1 else 1
+
+        def lower(t, state):
+            self.event_evaluations += 1
+            return self.unsaturated_force(state, stabilizing) + self.force_limit
+        lower.terminal = True
+        lower.direction = 1 if saturation == -1 else -1
+
+        if saturation == 1:
+            return [capture, upper]
+        if saturation == -1:
+            return [capture, lower]
+        return [capture, upper, lower]
+
+    def simulate_hybrid(self, t_span, initial_state, dense=False):
+        """Integración por tramos reiniciando el integrador en cada conmutación.
+
+        Dentro de cada tramo la región de control y el estado de saturación
+        son fijos, por lo que el lado derecho es suave y el integrador no
+        reduce el paso alrededor de las discontinuidades. Con `dense` se
+        devuelve una Trajectory que une las salidas densas de los tramos.
+        """
+        dt = 0.01
+        n_points = int(t_span / dt) + 1
+        t = np.linspace(0, t_span, n_points)
+        solution = np.empty((n_points, 4))
+
+        state = np.asarray(initial_state, dtype=float)
+        stabilizing = abs(self.normalize_angle_error(state[1])) < self.capture_threshold
+        saturation = self._saturation_state(state, stabilizing)
+        t0 = 0.0
+        index = 0
+        self.rhs_evaluations = 0
+        self.event_evaluations = 0
+        self.mode_switches = 0
+        segments = []
+
+        while index < n_points:
+            def rhs(t, y):
+                if saturation == 0:
+                    F = self.unsaturated_force(y, stabilizing)
+                else:
+                    F = saturation * self.force_limit
+                return self.plant_dynamics(y, F)
+
+            events = self._hybrid_events(stabilizing, saturation)
+            result = solve_ivp(rhs, (t0, t_span), state,
+                               method='LSODA',
+                               t_eval=None if dense else t[index:],
+                               events=events,
+                               dense_output=dense,
+                               rtol=1e-8,
+                               atol=1e-8)
+            self.rhs_evaluations += result.nfev
+            segments.append(result)
+
+            if not dense:
+                n = result.t.size
+                solution[index:index + n] = result.y.T
+                index += n
+
+            if result.status != 1:
+                if result.status < 0:
+                    raise RuntimeError(result.message)
+                break
+
+            # Reinicio limpio desde el estado sobre la superficie de conmutación
+            fired = next(i for i, te in enumerate(result.t_events) if te.size)
+            t0 = result.t_events[fired][0]
+            state = result.y_events[fired][0]
+            self.mode_switches += 1
+
+            if events[fired].__name__ == 'capture':
+                stabilizing = not stabilizing
+                saturation = self._saturation_state(state, stabilizing)
+            elif saturation == 0:
+                saturation = 1 if events[fired].__name__ == 'upper' else -1
+            else:
+                saturation = 0
+
+        if dense:
+            from trajectory import Trajectory
+
+            return Trajectory.from_segments(segments)
+        return t[:index], solution[:index]
+
     def plot_results(self, t, solution):
         plt.figure(figsize=(12, 10))
 
@@ -151,7 +296,25 @@ def main():
     initial_state = [0.0, 0.2, 0.0, 0.0]
     t_span = 100.0
 
+    # Integración directa (odeint sobre el lado derecho discontinuo)
+    start = time.perf_counter()
     t, solution = system.simulate(t_span, initial_state)
+    wall_before = time.perf_counter() - start
+    rhs_before = system.rhs_evaluations
+
+    # Integración híbrida con detección de eventos en cada conmutación
+    start = time.perf_counter()
+    t, solution = system.simulate_hybrid(t_span, initial_state)
+    wall_after = time.perf_counter() - start
+    rhs_after = system.rhs_evaluations
+
+    # Las funciones de evento se cuentan aparte: cuestan casi lo mismo que
+    # el lado derecho, así que el tiempo de pared es la comparación justa
+    print(f"odeint: {rhs_before} evaluaciones del lado derecho, {wall_before:.3f} s")
+    print(f"Híbrido: {rhs_after} evaluaciones del lado derecho + "
+          f"{system.event_evaluations} de eventos en {system.mode_switches} conmutaciones, "
+          f"{wall_after:.3f} s")
+
     system.plot_results(t, solution)
 
 
@@ -1,3 +1,6 @@
+import os
+import sys
+
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.integrate import odeint
@@ -75,7 +78,52 @@ def plot_simulation(system, time_sim, initial_angle, kp, ki, kd):
     plt.grid(True)
     plt.show()
 
-def main():
+#Describe la misma figura que plot_simulation para dibujarla fuera de pantalla
+def simulation_spec(system, time_sim, initial_angle, kp, ki, kd, path):
+    t, angles = system.simulate(time_sim, np.radians(initial_angle), kp, ki, kd)
+    return {
+        'path': path,
+        'title': f'Respuesta del sistema con Kp={kp}, Ki={ki}, Kd={kd}',
+        'figsize': (10, 6),
+        'panels': [{'ylabel': 'Ángulo (º)', 'lines': [{'x': t, 'y': angles}]}],
+    }
+
+#Describe la misma figura que plot_responses para dibujarla fuera de pantalla
+def responses_spec(system, time_sim, initial_angle, param_name, param_values, path,
+                   base_kp=30, base_ki=5.52, base_kd=3.66):
+    lines = []
+    for value in param_values:
+        gains = {'kp': base_kp, 'ki': base_ki, 'kd': base_kd, param_name: value}
+        t, angles = system.simulate(time_sim, np.radians(initial_angle), gains['kp'], gains['ki'], gains['kd'])
+        lines.append({'x': t, 'y': angles, 'label': f'{param_name}={value}'})
+    return {
+        'path': path,
+        'title': f'Ángulo del péndulo vs tiempo (variando {param_name})',
+        'figsize': (10, 6),
+        'panels': [{'ylabel': 'Ángulo (º)', 'lines': lines}],
+    }
+
+#Dibuja todas las figuras en procesos paralelos y una figura comparativa
+#(desde la raíz del repositorio: python -m Proyecto_prueba.pendulum_pid_controller salida/)
+def render_sweep(system, time_sim, initial_angle, sweeps, cases, output_dir, fmt='png', workers=None):
+    from figure_renderer import render_figures, comparison_figure
+
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(responses_spec, (system, time_sim, initial_angle, name, values,
+                              os.path.join(output_dir, f'sintonizacion_{name}.{fmt}'), *bases))
+            for name, values, bases in sweeps]
+    jobs += [(simulation_spec, (system, time_sim, initial_angle, kp, ki, kd,
+                                os.path.join(output_dir, f'caso_{i:03d}.{fmt}')))
+             for i, (kp, ki, kd) in enumerate(cases)]
+    rendered = render_figures(jobs, workers)
+
+    runs = [{'title': preview['title'].replace('Respuesta del sistema con ', ''),
+             'lines': preview['panels'][0]['lines']}
+            for _, preview in rendered[len(sweeps):]]
+    comparison = comparison_figure(runs, os.path.join(output_dir, f'comparacion.{fmt}'))
+    return [path for path, _ in rendered], comparison
+
+def main(output_dir=None):
     # Inicialización
     system = PendulumSystem()
     initial_angle = 10  # grados
@@ -86,6 +134,28 @@ def main():
     ki_values = np.arange(0, 16, 2)
     kd_values = np.arange(0, 16, 2)
 
+    #Pruebas para variantes de PID (kp, ki, kd)
+    cases = [
+        #1. P (valores de ki=0 y kd=0)
+        (100, 0, 0), (30, 0, 0), (0.1, 0, 0),
+        #2.PI (valores kd=0)
+        (1000, 1000, 0), (1000, 10, 0), (1000, 0.5, 0),
+        #3.PD (valores ki = 0)
+        (100, 0, 1), (100, 0, 5), (100, 0, 50),
+        #4 Prueba PID
+        (100, 0.2, 6), (100, 1, 6), (100, 1000, 6),
+    ]
+
+    # Con una carpeta de salida todo se dibuja fuera de pantalla y en paralelo
+    if output_dir is not None:
+        sweeps = [('kp', kp_values, (30, 5.52, 3.66)),
+                  ('ki', ki_values, (40, 5.52, 3.66)),
+                  ('kd', kd_values, (40, 0, 3.66))]
+        paths, comparison = render_sweep(system, time_sim, initial_angle, sweeps,
+                                         [(40, 0, 4)] + cases, output_dir)
+        print(f"{len(paths)} figuras y {comparison} guardadas en {output_dir}")
+        return
+
     # Graficar variando KP
     print("Sintonizando KP...")
     plot_responses(system, time_sim, initial_angle, 'kp', kp_values)
@@ -110,27 +180,8 @@ def main():
     plt.grid(True)
     plt.show()
 
-
-    #Pruebas para variantes de PID
-    #1. P (valores de ki=0 y kd=0)
-    plot_simulation(system, time_sim, initial_angle, kp=100, ki=0, kd=0)
-    plot_simulation(system, time_sim, initial_angle, kp=30, ki=0, kd=0)
-    plot_simulation(system, time_sim, initial_angle, kp=0.1, ki=0, kd=0)
-
-    #2.PI (valores kd=0)
-    plot_simulation(system, time_sim, initial_angle, kp=1000, ki=1000, kd=0)
-    plot_simulation(system, time_sim, initial_angle, kp=1000, ki=10, kd=0)
-    plot_simulation(system, time_sim, initial_angle, kp=1000, ki=0.5, kd=0)
-
-    #3.PD (valores ki = 0)
-    plot_simulation(system, time_sim, initial_angle, kp=100, ki=0, kd=1)
-    plot_simulation(system, time_sim, initial_angle, kp=100, ki=0, kd=5)
-    plot_simulation(system, time_sim, initial_angle, kp=100, ki=0, kd=50)
-
-    #4 Prueba PID
-    plot_simulation(system, time_sim, initial_angle, kp=100, ki=0.2, kd=6)
-    plot_simulation(system, time_sim, initial_angle, kp=100, ki=1, kd=6)
-    plot_simulation(system, time_sim, initial_angle, kp=100, ki=1000, kd=6)
+    for kp, ki, kd in cases:
+        plot_simulation(system, time_sim, initial_angle, kp=kp, ki=ki, kd=kd)
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,282 @@
+"""Mapas de estabilidad y márgenes de los modelos PID de Proyecto_prueba.
+
+Uso:
+    python stability_maps.py --model pendulum --plane kd --kp 0 100 --gain 0 20 --fixed 0 \\
+        --points 500 --out mapa_pendulo_kp_kd.png --table mapa_pendulo_kp_kd.csv
+
+Para cada punto de una malla 2-D de ganancias (kp×kd o kp×ki, con la tercera
+fija) se calculan los polos de lazo cerrado, el amortiguamiento mínimo y los
+márgenes de ganancia y de fase del lazo L(s) = C(s) P(s), con
+C(s) = (kd s² + kp s + ki) / s y realimentación unitaria negativa.
+
+Todo se calcula en lote con NumPy: los polos y las frecuencias de cruce son
+raíces de polinomios, obtenidas como autovalores de matrices compañeras
+apiladas, y L(jω) se evalúa en todas las frecuencias de cruce a la vez.
+"""
+import argparse
+import time
+
+import numpy as np
+
+
+# Denominador de la planta P(s) = 1 / den(s) de cada modelo linealizado,
+# con los parámetros por defecto de las clases de Proyecto_prueba
+def pendulum_plant(m=1.0, l=1.0, b=0.1, g=9.81):
+    # PendulumSystem cerca de theta = 0: m l² θ'' + b θ' - m g l θ = u
+    return np.array([m * l ** 2, b, -m * g * l])
+
+
+def car_plant(M=1.0, m=0.1, l=0.5):
+    # CarControllerPID: X(s)/U(s) = 1 / ((M + m - m l) s²)
+    return np.array([M + m - m * l, 0.0, 0.0])
+
+
+MODELS = {"pendulum": pendulum_plant, "car": car_plant}
+
+
+def batched_roots(coeffs, tol=1e-12):
+    """Raíces de muchos polinomios (filas, potencias descendentes).
+
+    Las filas se agrupan por grado efectivo (coeficientes principales nulos
+    se descartan) y cada grupo se resuelve con los autovalores de sus
+    matrices compañeras apiladas. Devuelve (N, grado máximo) complejo,
+    rellenado con NaN donde el polinomio tiene menos raíces.
+    """
+    coeffs = np.asarray(coeffs, dtype=float)
+    n, width = coeffs.shape
+    roots = np.full((n, width - 1), np.nan, dtype=complex)
+
+    scale = np.abs(coeffs).max(axis=1, keepdims=True)
+    nonzero = np.abs(coeffs) > tol * np.where(scale > 0, scale, 1.0)
+    lead = np.where(nonzero.any(axis=1), nonzero.argmax(axis=1), width - 1)
+
+    for start in np.unique(lead):
+        degree = width - 1 - start
+        if degree == 0:
+            continue
+        rows = np.nonzero(lead == start)[0]
+        monic = coeffs[rows, start + 1:] / coeffs[rows, start:start + 1]
+        companion = np.zeros((len(rows), degree, degree))
+        companion[:, 0, :] = -monic
+        companion[:, np.arange(1, degree), np.arange(degree - 1)] = 1.0
+        roots[rows, :degree] = np.linalg.eigvals(companion)
+    return roots
+
+
+def _at_jw(coeffs):
+    """Partes real e imaginaria de p(jω) como polinomios reales en ω"""
+    degree = coeffs.shape[1] - 1
+    real = np.zeros_like(coeffs)
+    imag = np.zeros_like(coeffs)
+    for k in range(degree + 1):
+        power = degree - k
+        # j^power: 1, j, -1, -j
+        sign = (1, 1, -1, -1)[power % 4]
+        target = real if power % 2 == 0 else imag
+        target[:, k] = sign * coeffs[:, k]
+    return real, imag
+
+
+def _poly_mul(a, b):
+    out = np.zeros((a.shape[0], a.shape[1] + b.shape[1] - 1))
+    for i in range(a.shape[1]):
+        out[:, i:i + b.shape[1]] += a[:, i:i + 1] * b
+    return out
+
+
+def _pad(a, width):
+    return np.pad(a, ((0, 0), (width - a.shape[1], 0)))
+
+
+def _polyval(coeffs, x):
+    # Horner en lote: coeffs (N, n), x (N, k)
+    result = np.zeros(x.shape, dtype=complex)
+    for k in range(coeffs.shape[1]):
+        result = result * x + coeffs[:, k:k + 1]
+    return result
+
+
+def _positive_real(roots):
+    """Raíces reales positivas (las demás como NaN)"""
+    real = roots.real
+    ok = np.isfinite(roots) & (np.abs(roots.imag) <= 1e-7 * np.maximum(np.abs(real), 1.0)) & (real > 1e-18)
+    return np.where(ok, real, np.nan)
+
+
+def _crossings(poly, odd=False):
+    """Frecuencias ω > 0 donde se anula un polinomio par (o impar) en ω.
+
+    Sólo tiene potencias pares (o impares, que se dividen por ω), así que
+    se resuelve en w = ω², con la mitad del grado.
+    """
+    coeffs = poly[:, 1::2] if odd else poly[:, ::2]
+    return np.sqrt(_positive_real(batched_roots(coeffs)))
+
+
+def stability_metrics(kp, ki, kd, plant):
+    """Polos, amortiguamiento y márgenes para arreglos de ganancias (misma forma)"""
+    shape = np.shape(kp)
+    kp, ki, kd = (np.ravel(np.broadcast_to(g, shape)).astype(float) for g in (kp, ki, kd))
+    n = kp.size
+
+    # Lazo: L = num / den con num = kd s² + kp s + ki, den = s · plant(s)
+    num = np.column_stack((kd, kp, ki))
+    den = np.tile(np.append(plant, 0.0), (n, 1))
+    width = max(num.shape[1], den.shape[1])
+    num, den = _pad(num, width), _pad(den, width)
+
+    # Con ki = 0 el integrador se cancela con el cero de C(s) en s = 0:
+    # se simplifican los factores s comunes para no contar un polo espurio
+    for _ in range(width - 1):
+        common = (num[:, -1] == 0) & (den[:, -1] == 0)
+        if not common.any():
+            break
+        num[common] = np.roll(num[common], 1, axis=1)
+        den[common] = np.roll(den[common], 1, axis=1)
+
+    # Polos de lazo cerrado: raíces de den + num
+    poles = batched_roots(den + num)
+    magnitude = np.abs(poles)
+    damping = np.where(magnitude > 1e-12, -poles.real / np.where(magnitude > 1e-12, magnitude, 1.0), 1.0)
+    min_damping = np.nanmin(damping, axis=1)
+    # Filas sin raíces (p. ej. todas las ganancias nulas) quedan en NaN sin
+    # pasar por nanmax, que avisa con filas enteras de NaN
+    missing = np.isnan(poles.real)
+    max_real = np.where(missing.all(axis=1), np.nan, np.where(missing, -np.inf, poles.real).max(axis=1))
+
+    num_re, num_im = _at_jw(num)
+    den_re, den_im = _at_jw(den)
+
+    # Cruce de ganancia: |num(jω)|² = |den(jω)|² (polinomio par en ω)
+    gain_poly = (_poly_mul(num_re, num_re) + _poly_mul(num_im, num_im) -
+                 _poly_mul(den_re, den_re) - _poly_mul(den_im, den_im))
+    gain_cross = _crossings(gain_poly)
+
+    # Cruce de fase (-180°): Im(num · conj(den)) = 0 con Re(L) < 0 (impar en ω)
+    phase_poly = _poly_mul(num_im, den_re) - _poly_mul(num_re, den_im)
+    phase_cross = _crossings(phase_poly, odd=True)
+
+    def loop_at(omega):
+        s = 1j * np.nan_to_num(omega, nan=1.0)
+        values = _polyval(num, s) / _polyval(den, s)
+        return np.where(np.isnan(omega), np.nan, values)
+
+    with np.errstate(divide='ignore', invalid='ignore', all='ignore'):
+        L_gain = loop_at(gain_cross)
+        phase = np.degrees(np.angle(L_gain))
+        pm = (phase + 180.0 + 180.0) % 360.0 - 180.0
+        pm = np.where(np.isnan(gain_cross), np.nan, pm)
+        phase_margin = np.where(np.isnan(pm).all(axis=1), np.inf,
+                                np.nanmin(np.where(np.isnan(pm), np.inf, pm), axis=1))
+
+        L_phase = loop_at(phase_cross)
+        crosses = np.isfinite(phase_cross) & (L_phase.real < 0)
+        gm = np.where(crosses, -20 * np.log10(np.abs(L_phase)), np.inf)
+        gain_margin = gm.min(axis=1)
+
+    return {
+        "poles": poles.reshape(shape + (-1,)),
+        "stable": (max_real < 0).reshape(shape),
+        "max_real": max_real.reshape(shape),
+        "damping": min_damping.reshape(shape),
+        "gain_margin_db": gain_margin.reshape(shape),
+        "phase_margin_deg": phase_margin.reshape(shape),
+    }
+
+
+def stability_map(model="pendulum", plane="kd", kp_range=(0, 100), gain_range=(0, 20), fixed=0.0,
+                  points=500, **params):
+    """Métricas sobre la malla kp × `plane` (kd o ki), con la otra ganancia en `fixed`"""
+    plant = MODELS[model](**params)
+    kp = np.linspace(*kp_range, points)
+    gain = np.linspace(*gain_range, points)
+    KP, G = np.meshgrid(kp, gain, indexing="ij")
+    if plane == "kd":
+        metrics = stability_metrics(KP, fixed, G, plant)
+    else:
+        metrics = stability_metrics(KP, G, fixed, plant)
+    metrics.update(kp=kp, gain=gain, plane=plane, model=model, fixed=fixed)
+    return metrics
+
+
+def metrics_table(metrics):
+    """Tabla consultable (una fila por punto de la malla), p. ej.
+    table.query("stable and damping > 0.5 and phase_margin_deg > 45")"""
+    import pandas as pd
+
+    KP, G = np.meshgrid(metrics["kp"], metrics["gain"], indexing="ij")
+    return pd.DataFrame({
+        "kp": KP.ravel(),
+        metrics["plane"]: G.ravel(),
+        "stable": metrics["stable"].ravel(),
+        "max_real": metrics["max_real"].ravel(),
+        "damping": metrics["damping"].ravel(),
+        "gain_margin_db": metrics["gain_margin_db"].ravel(),
+        "phase_margin_deg": metrics["phase_margin_deg"].ravel(),
+    })
+
+
+def heatmaps(metrics, path):
+    """Mapas de calor de parte real máxima, amortiguamiento y márgenes"""
+    from matplotlib.figure import Figure
+
+    extent = (metrics["gain"][0], metrics["gain"][-1], metrics["kp"][0], metrics["kp"][-1])
+    panels = [
+        ("max_real", "Parte real máxima de los polos", "coolwarm"),
+        ("damping", "Amortiguamiento mínimo", "viridis"),
+        ("gain_margin_db", "Margen de ganancia (dB)", "magma"),
+        ("phase_margin_deg", "Margen de fase (°)", "magma"),
+    ]
+    fig = Figure(figsize=(12, 10))
+    axes = fig.subplots(2, 2)
+    for ax, (name, title, cmap) in zip(axes.ravel(), panels):
+        values = np.where(np.isfinite(metrics[name]), metrics[name], np.nan)
+        if name == "max_real":
+            limit = np.nanpercentile(np.abs(values), 95)
+            image = ax.imshow(values, origin="lower", aspect="auto", extent=extent, cmap=cmap,
+                              vmin=-limit, vmax=limit)
+        else:
+            image = ax.imshow(values, origin="lower", aspect="auto", extent=extent, cmap=cmap)
+        # Frontera de estabilidad
+        ax.contour(metrics["gain"], metrics["kp"], metrics["stable"].astype(float), levels=[0.5],
+                   colors="k", linewidths=1)
+        fig.colorbar(image, ax=ax)
+        if not np.isfinite(values).any():
+            # p. ej. margen de ganancia sin cruce de -180° en toda la malla
+            ax.text(0.5, 0.5, "infinito en toda la malla", transform=ax.transAxes, ha="center")
+        ax.set_title(title)
+        ax.set_xlabel(metrics["plane"])
+        ax.set_ylabel("kp")
+
+    other = "ki" if metrics["plane"] == "kd" else "kd"
+    fig.suptitle(f"Modelo {metrics['model']}: kp × {metrics['plane']} ({other} = {metrics['fixed']})")
+    fig.savefig(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mapas de estabilidad y márgenes sobre mallas de ganancias")
+    parser.add_argument("--model", choices=sorted(MODELS), default="pendulum")
+    parser.add_argument("--plane", choices=["kd", "ki"], default="kd", help="Segunda ganancia de la malla")
+    parser.add_argument("--kp", type=float, nargs=2, default=[0, 100])
+    parser.add_argument("--gain", type=float, nargs=2, default=[0, 20], help="Rango de kd o ki")
+    parser.add_argument("--fixed", type=float, default=0.0, help="Valor de la ganancia que no se barre")
+    parser.add_argument("--points", type=int, default=500, help="Puntos por eje")
+    parser.add_argument("--out", default=None, help="Imagen con los mapas de calor")
+    parser.add_argument("--table", default=None, help="CSV con una fila por punto")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    metrics = stability_map(args.model, args.plane, args.kp, args.gain, args.fixed, args.points)
+    elapsed = time.perf_counter() - start
+    stable = metrics["stable"]
+    print(f"{stable.size} puntos en {elapsed:.2f} s; estables: {100 * stable.mean():.1f} %")
+
+    if args.out:
+        heatmaps(metrics, args.out)
+    if args.table:
+        metrics_table(metrics).to_csv(args.table, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
+import os
+import uuid
+
 import streamlit as st
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.integrate import odeint
-import pandas as pd
-from deap import base, creator, tools, algorithms
-import random
-import multiprocessing
-import array
+
+# Sólo lo indispensable para dibujar la primera página: scipy, matplotlib,
+# pandas y la pila del algoritmo genético (deap, multiprocessing) se
+# importan la primera vez que se usan (ver import_budget.py)
+from instrumentation import recorder, export, simulation_record, InstrumentedMap, GenerationStats
+from results_store import ResultsStore, system_parameters
+from job_scheduler import request_key
 
 
 # Definimos la clase del sistema de Péndulo Invertido con Control PID
@@ -25,12 +28,21 @@ class CartPoleSystem:
         self.x_ref = 0.0  # Posición deseada del carro
         self.theta_ref = 0.0  # Ángulo deseado del péndulo
 
+        # Tabla de ganancias opcional: si está definida, kp/kd se interpolan
+        # en línea a partir del ángulo actual y los parámetros del sistema
+        self.schedule = None
+
     def system_dynamics(self, state, t):
         x, theta, x_dot, theta_dot = state
 
         theta_error = theta - self.theta_ref
         x_error = x - self.x_ref
 
+        # Modo de ganancias programadas
+        if self.schedule is not None:
+            (self.pendulum_pid['kp'], self.pendulum_pid['kd'],
+             self.cart_pid['kp'], self.cart_pid['kd']) = self.schedule.lookup(theta, self.M, self.m, self.l)
+
         # Actualización de los errores integrales
         dt = 0.01
         self.pendulum_pid['integral_error'] += theta_error * dt
@@ -59,52 +71,105 @@ class CartPoleSystem:
 
         return [x_dot, theta_dot, x_ddot, theta_ddot]
 
-    def simulate(self, t_span, initial_state):
+    def simulate(self, t_span, initial_state, fast_path=False, dense=False):
+        # Vía rápida lineal cerca del equilibrio con respaldo no lineal
+        if fast_path:
+            from linear_propagator import LinearizedPropagator
+            self.propagator = LinearizedPropagator(self)
+            t, solution = self.propagator.simulate(t_span, initial_state)
+            if dense:
+                from trajectory import Trajectory
+                return Trajectory.from_samples(t, solution)
+            return t, solution
+
+        # Trayectoria perezosa sobre el interpolante del integrador
+        if dense:
+            from trajectory import integrate
+            return integrate(self.system_dynamics, t_span, initial_state)
+
+        from scipy.integrate import odeint
+
         t = np.linspace(0, t_span, int(t_span / 0.01))
-        solution = odeint(self.system_dynamics, initial_state, t)
+        solution, info = odeint(self.system_dynamics, initial_state, t, full_output=True)
+        recorder.record_solver(info)
         return t, solution
 
 # Función para optimizar los parámetros PID usando algoritmos genéticos
-def evaluate(individual):
+def evaluate(individual, t_span=10.0, dt=0.01, rtol=None, atol=None, cost_only=False):
+    from scipy.integrate import odeint
+
     system = CartPoleSystem(
         {'kp': individual[0], 'ki': 0, 'kd': individual[1], 'integral_error': 0},
         {'kp': individual[2], 'ki': 0, 'kd': individual[3], 'integral_error': 0}
     )
 
-    t_span = 10.0
     initial_state = [0.0, np.radians(30.0), 0.0, 0.0]
-    t = np.linspace(0, t_span, int(t_span / 0.01))
+
+    # Sólo el costo final, acumulado como estado aumentado (sin trayectoria)
+    if cost_only:
+        from cart_pole_genetic_controller import evaluate_cost
+
+        return (evaluate_cost(system, initial_state, t_span, dt, rtol, atol),)
+
+    t = np.linspace(0, t_span, int(t_span / dt))
 
     try:
-        solution = odeint(system.system_dynamics, initial_state, t)
+        with recorder.phase("integrate"):
+            solution, info = odeint(system.system_dynamics, initial_state, t,
+                                    rtol=rtol, atol=atol, full_output=True)
+        recorder.record_solver(info)
 
         # Error cuadrático y penalización de oscilaciones
-        x_error = np.sum((solution[:, 0] - system.x_ref) ** 2)
-        theta_error = np.sum((solution[:, 1] - system.theta_ref) ** 2)
-        x_oscillation = np.sum(np.diff(solution[:, 0]) ** 2)
-        theta_oscillation = np.sum(np.diff(solution[:, 1]) ** 2)
+        with recorder.phase("score"):
+            x_error = np.sum((solution[:, 0] - system.x_ref) ** 2)
+            theta_error = np.sum((solution[:, 1] - system.theta_ref) ** 2)
+            x_oscillation = np.sum(np.diff(solution[:, 0]) ** 2)
+            theta_oscillation = np.sum(np.diff(solution[:, 1]) ** 2)
 
-        fitness = x_error + 10 * theta_error + 0.1 * x_oscillation + 0.1 * theta_oscillation
+            fitness = x_error + 10 * theta_error + 0.1 * x_oscillation + 0.1 * theta_oscillation
         return (fitness,)
     except:
         return (float('inf'),)
 
 
 # Crear el algoritmo genético
-def genetic_algorithm():
+def genetic_algorithm(multi_fidelity=False, fraction=0.3, cost_only=False, scheduler=None, sample_size=0):
+    from multi_fidelity import MultiFidelityMap, DEFAULT_LEVELS
+    from deap import base, creator, tools, algorithms
+    import random
+    import multiprocessing
+    import array
+
     creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
     creator.create("Individual", array.array, typecode='d', fitness=creator.FitnessMin)
 
     toolbox = base.Toolbox()
-    pool = multiprocessing.Pool()
-    toolbox.register("map", pool.map)
+
+    # Con el planificador compartido se usa su pool (presupuesto fijo de
+    # workers para todas las sesiones); sin él, un pool propio
+    pool = None
+    if scheduler is not None:
+        map_func = InstrumentedMap(scheduler.map)
+    else:
+        workers = multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(workers)
+        map_func = InstrumentedMap(pool.map, workers)
+
+    # Escalera de fidelidad: todos con la evaluación barata, sólo la
+    # fracción mejor clasificada avanza hasta la evaluación completa
+    ladder = None
+    if multi_fidelity:
+        ladder = MultiFidelityMap(map_func, DEFAULT_LEVELS, [fraction] * (len(DEFAULT_LEVELS) - 1),
+                                  sample_size=sample_size)
+        map_func = ladder
+    toolbox.register("map", map_func)
 
     # Genes: [pendulum_kp, pendulum_kd, cart_kp, cart_kd]
     toolbox.register("attr_float", random.uniform, 0, 100)
     toolbox.register("individual", tools.initRepeat, creator.Individual, toolbox.attr_float, n=4)
     toolbox.register("population", tools.initRepeat, list, toolbox.individual)
 
-    toolbox.register("evaluate", evaluate)
+    toolbox.register("evaluate", evaluate, cost_only=cost_only)
     toolbox.register("mate", tools.cxTwoPoint)
     toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=10, indpb=0.2)
     toolbox.register("select", tools.selTournament, tournsize=3)
@@ -112,11 +177,56 @@ def genetic_algorithm():
     population = toolbox.population(n=50)
     ngen = 20
 
-    result, logbook = algorithms.eaSimple(population, toolbox, cxpb=0.7, mutpb=0.3, ngen=ngen, verbose=True)
-    pool.close()
+    # Estadísticas de fitness más métricas del solver y de los workers
+    stats = GenerationStats()
+
+    result, logbook = algorithms.eaSimple(population, toolbox, cxpb=0.7, mutpb=0.3, ngen=ngen,
+                                          stats=stats, verbose=True)
+    if pool is not None:
+        pool.close()
 
     best = tools.selBest(result, k=1)[0]
-    return best
+    return best, logbook, result, ladder.summary() if ladder else None
+
+@st.cache_resource
+def get_store():
+    # Almacén local de simulaciones y optimizaciones anteriores, compartido
+    # por todas las sesiones y los hilos del planificador
+    return ResultsStore()
+
+
+store = get_store()
+
+
+@st.cache_resource
+def load_gain_schedule():
+    from gain_schedule import GainSchedule, SCHEDULE_FILE
+
+    if not os.path.exists(SCHEDULE_FILE):
+        return None
+    return GainSchedule.load(SCHEDULE_FILE)
+
+
+@st.cache_resource
+def get_scheduler():
+    # Un único planificador para todas las sesiones del servidor
+    from job_scheduler import JobScheduler
+
+    return JobScheduler()
+
+
+scheduler = get_scheduler()
+session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+
+def run_job(key, func, *args):
+    """Encola un trabajo en el planificador compartido y espera su resultado"""
+    future = scheduler.submit(session_id, key, func, *args)
+    position = scheduler.position(future)
+    message = f"En cola (posición {position})..." if position else "Calculando..."
+    with st.spinner(message):
+        return future.result()
+
 
 # Streamlit para la interfaz interactiva
 st.title("Simulador de Péndulo Invertido con Control PID- Grupo 5")
@@ -130,55 +240,295 @@ kp_cart = st.slider("KP del carro", 0, 50, 1)
 ki_cart = st.slider("KI del carro", 0, 10, 0)
 kd_cart = st.slider("KD del carro", 0, 50, 1)
 
-# Botón para ejecutar simulación
-if st.button("Ejecutar simulación"):
-    pendulum_pid = {'kp': kp_pendulum, 'ki': ki_pendulum, 'kd': kd_pendulum, 'integral_error': 0}
-    cart_pid = {'kp': kp_cart, 'ki': ki_cart, 'kd': kd_cart, 'integral_error': 0}
+# Propagación lineal cerca del equilibrio (sólo aplica con KI = 0)
+fast_path = st.checkbox("Vía rápida lineal cerca del equilibrio", value=False)
+
+# Ganancias precalculadas (python gain_schedule.py genera la tabla)
+schedule = load_gain_schedule()
+scheduled = False
+if schedule is not None:
+    defaults = CartPoleSystem({}, {})
+    suggested = schedule.lookup(np.radians(30.0), defaults.M, defaults.m, defaults.l)
+    st.caption(f"Ganancias sugeridas para 30°: péndulo KP = {suggested[0]:.2f}, KD = {suggested[1]:.2f}; "
+               f"carro KP = {suggested[2]:.2f}, KD = {suggested[3]:.2f}")
+    scheduled = st.checkbox("Control con ganancias programadas según el ángulo", value=False)
+
+def simulation_job(gains, fast_path, scheduled, dense):
+    kp_p, ki_p, kd_p, kp_c, ki_c, kd_c = gains
+    pendulum_pid = {'kp': kp_p, 'ki': ki_p, 'kd': kd_p, 'integral_error': 0}
+    cart_pid = {'kp': kp_c, 'ki': ki_c, 'kd': kd_c, 'integral_error': 0}
 
     system = CartPoleSystem(pendulum_pid, cart_pid)
+    if scheduled:
+        system.schedule = schedule
+        fast_path = False  # la vía lineal supone ganancias fijas
 
     # Estado inicial del sistema
     initial_state = [0.0, np.radians(30.0), 0.0, 0.0]
-    
+
     # Simulación
-    t, solution = system.simulate(40.0, initial_state)
+    before = recorder.snapshot()
+    with recorder.phase("integrate"):
+        result = system.simulate(40.0, initial_state, fast_path=fast_path, dense=dense)
+    if dense:
+        trajectory = result
+    else:
+        # Malla fija de odeint, con la misma interfaz que la salida densa
+        from trajectory import Trajectory
+        trajectory = Trajectory.from_samples(*result)
+    fraction = system.propagator.fast_path_fraction if fast_path else None
+
+    # Se guarda una sola vez aunque varias sesiones esperen el mismo trabajo
+    # (vista decimada: suficiente para superponer corridas)
+    t, solution = trajectory.view(2000)
+    store.save_simulation(t, solution, gains, initial_state, system_parameters(system), t_span=40.0)
+
+    # El rango de pasos se midió en el hilo del trabajo, no en el de la sesión
+    counters = recorder.since(before)
+    if recorder.last_step_range is not None:
+        counters["min_step"], counters["max_step"] = recorder.last_step_range
+    return trajectory, fraction, counters, system.x_ref
+
+
+# Salida densa opcional: la trayectoria se evalúa bajo demanda sobre el
+# interpolante del integrador (con KI > 0 el error integral acumulado en cada
+# evaluación obliga a pasos diminutos y la integración se corta por límite)
+dense = st.checkbox("Salida densa del integrador (sólo KI = 0)", value=False)
+
+# Resolución del CSV exportado
+csv_step = st.selectbox("Paso del CSV (s)", [0.01, 0.05, 0.1, 0.5], index=0)
 
-    # Mostrar los resultados
-    fig, ax = plt.subplots(2, 1, figsize=(10, 6))
+# Botón para ejecutar simulación
+if st.button("Ejecutar simulación"):
+    gains = [kp_pendulum, ki_pendulum, kd_pendulum, kp_cart, ki_cart, kd_cart]
+    fast_path = fast_path and not scheduled
+    key = request_key("simulation", gains=gains, fast_path=fast_path, scheduled=scheduled, dense=dense)
+    trajectory, fast_fraction, counters, x_ref = run_job(key, simulation_job, gains, fast_path, scheduled, dense)
+    if not trajectory.success:
+        st.warning(f"La integración se detuvo en t = {trajectory.t_max:.2f} s: {trajectory.message}")
+    if fast_path:
+        st.caption(f"Pasos con la vía rápida lineal: {100 * fast_fraction:.1f} %")
+
+    before = recorder.snapshot()
+
+    # Mostrar los resultados (vista decimada: unos mil puntos bastan en pantalla)
+    with recorder.phase("plot"):
+        import matplotlib.pyplot as plt
+
+        t, solution = trajectory.view(1000)
+
+        fig, ax = plt.subplots(2, 1, figsize=(10, 6))
+
+        ax[0].plot(t, solution[:, 0], label="Posición del carro")
+        ax[0].axhline(y=x_ref, color='r', linestyle='--', label="Referencia")
+        ax[0].set_ylabel("Posición (m)")
+        ax[0].set_title("Posición del Carro")
+        ax[0].legend()
+
+        ax[1].plot(t, np.degrees(solution[:, 1]), label="Ángulo del péndulo")
+        ax[1].axhline(y=0, color='r', linestyle='--', label="Referencia")
+        ax[1].set_ylabel("Ángulo (grados)")
+        ax[1].set_title("Ángulo del Péndulo")
+        ax[1].legend()
+
+        st.pyplot(fig)
+
+    # Guardar resultados en CSV, evaluados en la malla pedida
+    with recorder.phase("csv"):
+        import pandas as pd
+
+        t, solution = trajectory.sample(dt=csv_step)
+        results = pd.DataFrame({
+            "Tiempo": t,
+            "Posición del carro (m)": solution[:, 0],
+            "Ángulo del péndulo (grados)": np.degrees(solution[:, 1]),
+        })
+        csv_data = results.to_csv(index=False)
+
+    # Métricas de esta simulación
+    counters = dict(counters)
+    for name, value in recorder.since(before).items():
+        counters[name] = counters.get(name, 0) + value
+    record = simulation_record(counters, fast_path=fast_path, csv_rows=len(t))
+    export(record)
+    st.session_state["simulation_metrics"] = record
+
+    # Opción de descarga
+    st.download_button(
+        label="Descargar resultados como CSV",
+        data=csv_data,
+        file_name="simulation_results.csv",
+        mime="text/csv",
+    )
+
+# Robustez ante ruido de sensores, perturbaciones y condiciones iniciales
+st.header("Análisis de robustez (Monte Carlo)")
+mc_runs = st.number_input("Número de realizaciones", 100, 50000, 2000, step=100)
+mc_sensor_noise = st.slider("Ruido del sensor de ángulo (grados)", 0.0, 5.0, 0.5)
+mc_force_noise = st.slider("Perturbación de fuerza (N, desviación estándar)", 0.0, 10.0, 1.0)
+mc_initial_std = st.slider("Dispersión del ángulo inicial (grados)", 0.0, 20.0, 5.0)
+
+if st.button("Ejecutar análisis Monte Carlo"):
+    import matplotlib.pyplot as plt
+    from monte_carlo import run_monte_carlo, plot_bands
+
+    noise = np.radians(mc_sensor_noise)
+    gains = [kp_pendulum, kd_pendulum, kp_cart, kd_cart]
+    key = request_key("monte_carlo", gains=gains, runs=int(mc_runs), sensor_noise=mc_sensor_noise,
+                      force_noise=mc_force_noise, initial_std=mc_initial_std)
+    result = run_job(key, lambda: run_monte_carlo(gains, runs=int(mc_runs),
+                                                  initial_std=(0.0, np.radians(mc_initial_std), 0.0, 0.0),
+                                                  sensor_noise=(0.01, noise, 0.01, 5 * noise),
+                                                  force_noise=mc_force_noise, pool=scheduler))
 
-    ax[0].plot(t, solution[:, 0], label="Posición del carro")
-    ax[0].axhline(y=system.x_ref, color='r', linestyle='--', label="Referencia")
+    fig, ax = plt.subplots(2, 1, figsize=(10, 6))
+    plot_bands(ax[0], result["t"], result["x"], color='b', label="Posición")
     ax[0].set_ylabel("Posición (m)")
     ax[0].set_title("Posición del Carro")
     ax[0].legend()
-
-    ax[1].plot(t, np.degrees(solution[:, 1]), label="Ángulo del péndulo")
-    ax[1].axhline(y=0, color='r', linestyle='--', label="Referencia")
+    plot_bands(ax[1], result["t"], result["theta"], scale=np.degrees(1.0), color='g', label="Ángulo")
     ax[1].set_ylabel("Ángulo (grados)")
     ax[1].set_title("Ángulo del Péndulo")
     ax[1].legend()
-
     st.pyplot(fig)
+    st.write(f"Tasa de falla: {100 * result['failure_rate']:.1f} % "
+             f"({result['failures']} de {result['runs']} realizaciones)")
 
-    # Guardar resultados en CSV
-    results = pd.DataFrame({
-        "Tiempo": t,
-        "Posición del carro (m)": solution[:, 0],
-        "Ángulo del péndulo (grados)": np.degrees(solution[:, 1]),
-    })
+# Botón para optimizar parámetros con algoritmo genético
+multi_fidelity = st.checkbox("Evaluación multifidelidad", value=False)
+fraction = st.slider("Fracción promovida por nivel", 0.1, 1.0, 0.3) if multi_fidelity else 0.3
+# Descartados por nivel que además se evalúan completos: ahorro sin sesgo a
+# cambio de trabajo extra (sin muestra el ahorro es una cota inferior)
+sample_size = st.number_input("Descartados muestreados por nivel", 0, 10, 0) if multi_fidelity else 0
+cost_only = st.checkbox("Evaluar sólo el costo (sin guardar trayectorias)", value=False)
+
+def optimization_job(multi_fidelity, fraction, cost_only, sample_size):
+    best, logbook, population, summary = genetic_algorithm(multi_fidelity, fraction, cost_only, scheduler,
+                                                           sample_size)
+    store.save_optimization(logbook, population, system_parameters(CartPoleSystem({}, {})),
+                            initial_state=[0.0, np.radians(30.0), 0.0, 0.0], t_span=10.0)
+    return best, logbook, summary
 
-    # Opción de descarga
-    st.download_button(
-        label="Descargar resultados como CSV",
-        data=results.to_csv(index=False),
-        file_name="simulation_results.csv",
-        mime="text/csv",
-    )
 
-# Botón para optimizar parámetros con algoritmo genético
 if st.button("Optimizar parámetros PID"):
-    best_gains = genetic_algorithm()
+    key = request_key("optimization", multi_fidelity=multi_fidelity, fraction=fraction, cost_only=cost_only,
+                      sample_size=sample_size)
+    best_gains, logbook, fidelity_summary = run_job(key, optimization_job, multi_fidelity, fraction, cost_only,
+                                                    sample_size)
+    if fidelity_summary:
+        if fidelity_summary["lower_bound"]:
+            st.caption(f"Tiempo ahorrado frente a evaluar todo en fidelidad completa: al menos "
+                       f"{fidelity_summary['time_saved']:.2f} s (cota inferior, sin muestra de descartados)")
+        else:
+            error = fidelity_summary["error"]
+            st.caption(f"Tiempo ahorrado frente a evaluar todo en fidelidad completa: "
+                       f"{fidelity_summary['time_saved']:.2f} s" +
+                       (f" ± {error:.2f} s" if error is not None else ""))
+        st.table([{"Nivel": k, "Evaluaciones": level["evaluations"], "Tiempo (s)": level["time"],
+                   "Tiempo ahorrado (s)": level["time_saved"],
+                   "Error estándar (s)": ("cota inferior" if level["lower_bound"] else
+                                          "-" if level["error"] is None else f"{level['error']:.4f}")}
+                  for k, level in enumerate(fidelity_summary["levels"])])
+    st.session_state["generation_metrics"] = list(logbook)
 
     st.write(f"Mejores ganancias encontradas:")
     st.write(f"Péndulo: KP = {best_gains[0]:.2f}, KD = {best_gains[1]:.2f}")
     st.write(f"Carro: KP = {best_gains[2]:.2f}, KD = {best_gains[3]:.2f}")
+
+# Optimización multiobjetivo: el frente de Pareto completo en una corrida
+def pareto_job(cost_only):
+    from cart_pole_genetic_controller import optimize_pareto, scalar_fitness, OBJECTIVES
+
+    stats = GenerationStats(key=lambda ind: (scalar_fitness(ind.fitness.values),))
+    front, population, logbook = optimize_pareto(InstrumentedMap(scheduler.map),
+                                                 stats=stats, cost_only=cost_only)
+    params = system_parameters(CartPoleSystem({}, {}))
+    logbook_entry, _ = store.save_optimization(logbook, population, params, objectives=OBJECTIVES,
+                                               initial_state=[0.0, np.radians(30.0), 0.0, 0.0], t_span=10.0)
+    if front:
+        store.save_front(front, params, OBJECTIVES, run=logbook_entry["id"])
+    return len(front), logbook
+
+
+if st.button("Calcular frente de Pareto (NSGA-II)"):
+    key = request_key("pareto", cost_only=cost_only)
+    front_size, logbook = run_job(key, pareto_job, cost_only)
+    st.session_state["generation_metrics"] = list(logbook)
+    if front_size:
+        st.write(f"Frente de Pareto guardado con {front_size} conjuntos de ganancias")
+    else:
+        st.warning("Ningún candidato estable: no se obtuvo un frente de Pareto")
+
+# Elegir un compromiso sobre un frente guardado, sin volver a optimizar
+past_fronts = {f"#{e['id']} ({e['shape'][0]} puntos)": e for e in store.entries("pareto")
+               if len(e["shape"]) == 2 and e["shape"][0]}
+front_choice = st.selectbox("Frente de Pareto guardado", [""] + list(past_fronts))
+if front_choice:
+    import matplotlib.pyplot as plt
+    from cart_pole_genetic_controller import select_tradeoff
+
+    entry = past_fronts[front_choice]
+    data = store.load(entry)
+    objectives = data[:, 4:]
+    weights = [st.slider("Peso del error del carro", 0.0, 10.0, 1.0),
+               st.slider("Peso del error del ángulo", 0.0, 100.0, 10.0),
+               st.slider("Peso de las oscilaciones", 0.0, 10.0, 0.1)]
+    chosen = select_tradeoff(objectives, weights)
+
+    gains = data[chosen, :4]
+    st.write(f"Péndulo: KP = {gains[0]:.2f}, KD = {gains[1]:.2f}")
+    st.write(f"Carro: KP = {gains[2]:.2f}, KD = {gains[3]:.2f}")
+
+    fig, ax = plt.subplots(figsize=(8, 5))
+    points = ax.scatter(objectives[:, 0], objectives[:, 1], c=objectives[:, 2], cmap="viridis")
+    ax.scatter(objectives[chosen, 0], objectives[chosen, 1], s=150, facecolors="none",
+               edgecolors="r", label="Compromiso elegido")
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlabel("Error del carro")
+    ax.set_ylabel("Error del ángulo")
+    fig.colorbar(points, label="Oscilaciones")
+    ax.legend()
+    st.pyplot(fig)
+
+# Comparación con corridas guardadas (lectura sin copia desde el almacén)
+st.header("Resultados anteriores")
+past_simulations = {f"#{e['id']} ganancias={e['gains']}": e for e in store.entries("simulation")}
+selected = st.multiselect("Superponer simulaciones guardadas", list(past_simulations))
+if selected:
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(2, 1, figsize=(10, 6))
+    for label in selected:
+        data = store.load(past_simulations[label])
+        ax[0].plot(data[:, 0], data[:, 1], label=label)
+        ax[1].plot(data[:, 0], np.degrees(data[:, 2]), label=label)
+    ax[0].set_ylabel("Posición (m)")
+    ax[0].set_title("Posición del Carro")
+    ax[0].legend()
+    ax[1].set_ylabel("Ángulo (grados)")
+    ax[1].set_title("Ángulo del Péndulo")
+    ax[1].legend()
+    st.pyplot(fig)
+
+past_runs = {f"#{e['id']} ({e['shape'][0]} generaciones)": e for e in store.entries("logbook")}
+run = st.selectbox("Optimización guardada", [""] + list(past_runs))
+if run:
+    import pandas as pd
+
+    entry = past_runs[run]
+    st.dataframe(pd.DataFrame(store.load(entry), columns=entry["columns"]))
+    population = store.entries("population", run=entry["id"])
+    if population:
+        st.dataframe(pd.DataFrame(store.load(population[0]), columns=population[0]["columns"]))
+
+# Panel de métricas del solver y de las fases de cómputo
+st.sidebar.header("Métricas")
+if "simulation_metrics" in st.session_state:
+    st.sidebar.subheader("Última simulación")
+    st.sidebar.json(st.session_state["simulation_metrics"])
+if "generation_metrics" in st.session_state:
+    st.sidebar.subheader("Optimización por generación")
+    st.sidebar.dataframe(st.session_state["generation_metrics"])
+st.sidebar.subheader("Cola de trabajos")
+st.sidebar.json(scheduler.stats())
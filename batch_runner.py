@@ -0,0 +1,242 @@
+"""Ejecución desatendida de lotes de simulaciones.
+
+Uso:
+    python batch_runner.py jobs.json --out resultados_lote --workers 4 --figures
+
+El archivo de trabajos (JSON o YAML) es una lista, o un objeto con la clave
+"jobs", de entradas como:
+
+    {"name": "pd_400_10", "model": "cart_pole",
+     "controller": {"pendulum": {"kp": 400, "ki": 0, "kd": 10},
+                    "cart": {"kp": 1, "ki": 0, "kd": 1}},
+     "initial_state": [0.0, 0.5236, 0.0, 0.0], "horizon": 20.0}
+
+Modelos disponibles:
+    cart_pole  CartPoleSystem de cart_pole_controller.py
+    controladores
+               CartPoleSystem de "cart_pole_controller controladores.py"
+               (mismo formato de controller que cart_pole)
+    swing_up   CartPoleSystem de Modulo_mejorado/cart_pole_animation.py
+               (controller: atributos k_energy, k_theta, k_theta_dot, k_x, k_x_dot...)
+    pendulum   PendulumSystem de Proyecto_prueba (controller: kp, ki, kd;
+               initial_state: [theta])
+    car        CarControllerPID de Proyecto_prueba (controller: kp, ki, kd;
+               parámetros opcionales en "params": M, m, l, g)
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+
+# Sin ventanas: todas las figuras se escriben a disco
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+
+
+def job_key(job):
+    """Hash de los campos que determinan el resultado de un trabajo"""
+    spec = {name: job.get(name) for name in ("model", "controller", "initial_state", "horizon", "params")}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_jobs(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yml", ".yaml")):
+            import yaml
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+
+    jobs = spec["jobs"] if isinstance(spec, dict) else spec
+    for i, job in enumerate(jobs):
+        job.setdefault("name", f"job_{i}")
+        if "model" not in job:
+            raise ValueError(f"El trabajo {job['name']} no indica 'model'")
+    return jobs
+
+
+def _simulate_cart_pole(job):
+    from cart_pole_controller import CartPoleSystem
+
+    system = CartPoleSystem()
+    controller = job.get("controller", {})
+    for loop in ("pendulum", "cart"):
+        pid = getattr(system, f"{loop}_pid")
+        pid.update(controller.get(loop, {}))
+        pid['integral_error'] = 0
+    for name, value in job.get("params", {}).items():
+        setattr(system, name, value)
+
+    initial_state = job.get("initial_state", [0.0, np.radians(30.0), 0.0, 0.0])
+    t, solution = system.simulate(job.get("horizon", 40.0), initial_state)
+    return t, solution, ["x", "theta", "x_dot", "theta_dot"]
+
+
+def _simulate_controladores(job):
+    # El nombre del archivo tiene un espacio: se carga por ruta
+    import importlib.util
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cart_pole_controller controladores.py")
+    spec = importlib.util.spec_from_file_location("cart_pole_controladores", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    controller = job.get("controller", {})
+    pendulum_pid, cart_pid = ({'kp': 0, 'ki': 0, 'kd': 0, **controller.get(loop, {}), 'integral_error': 0}
+                              for loop in ("pendulum", "cart"))
+    system = module.CartPoleSystem(pendulum_pid, cart_pid)
+    for name, value in job.get("params", {}).items():
+        setattr(system, name, value)
+
+    initial_state = job.get("initial_state", [0.0, np.radians(30.0), 0.0, 0.0])
+    t, solution = system.simulate(job.get("horizon", 40.0), initial_state)
+    return t, solution, ["x", "theta", "x_dot", "theta_dot"]
+
+
+def _simulate_swing_up(job):
+    from Modulo_mejorado.cart_pole_animation import CartPoleSystem
+
+    system = CartPoleSystem()
+    for name, value in {**job.get("params", {}), **job.get("controller", {})}.items():
+        setattr(system, name, value)
+
+    initial_state = job.get("initial_state", [0.0, 0.2, 0.0, 0.0])
+    t, solution = system.simulate(job.get("horizon", 100.0), initial_state)
+    return t, solution, ["x", "theta", "x_dot", "theta_dot"]
+
+
+def _simulate_pendulum(job):
+    from Proyecto_prueba.pendulum_pid_controller import PendulumSystem
+
+    system = PendulumSystem()
+    for name, value in job.get("params", {}).items():
+        setattr(system, name, value)
+
+    c = job.get("controller", {})
+    theta0 = job.get("initial_state", [np.radians(10.0)])[0]
+    t, angles = system.simulate(job.get("horizon", 5.0), theta0, c.get("kp", 0), c.get("ki", 0), c.get("kd", 0))
+    return t, np.radians(angles)[:, None], ["theta"]
+
+
+def _simulate_car(job):
+    from Proyecto_prueba.car_pid_controller import CarControllerPID
+
+    p = {"M": 1.0, "m": 0.1, "l": 0.5, "g": 9.81, **job.get("params", {})}
+    theta0 = job.get("initial_state", [np.radians(10.0)])[0]
+    system = CarControllerPID(job.get("horizon", 20.0), np.degrees(theta0), p["M"], p["m"], p["l"], p["g"])
+
+    c = job.get("controller", {})
+    t, yout = system.simulate(c.get("kp", 0), c.get("ki", 0), c.get("kd", 0))
+    return t, np.asarray(yout)[:, None], ["x"]
+
+
+MODELS = {
+    "cart_pole": _simulate_cart_pole,
+    "controladores": _simulate_controladores,
+    "swing_up": _simulate_swing_up,
+    "pendulum": _simulate_pendulum,
+    "car": _simulate_car,
+}
+
+
+def trajectory_metrics(t, states, columns):
+    """Métricas resumen por variable: ISE, máximo absoluto y valor final"""
+    dt = np.diff(t, prepend=t[0])
+    metrics = {}
+    for i, name in enumerate(columns):
+        metrics[f"{name}_ise"] = float(np.sum(states[:, i] ** 2 * dt))
+        metrics[f"{name}_max_abs"] = float(np.max(np.abs(states[:, i])))
+        metrics[f"{name}_final"] = float(states[-1, i])
+    return metrics
+
+
+def save_figure(path, t, states, columns, title):
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(len(columns), 1, figsize=(10, 2.5 * len(columns)), squeeze=False)
+    for ax, i in zip(axes[:, 0], range(len(columns))):
+        ax.plot(t, states[:, i])
+        ax.set_ylabel(columns[i])
+        ax.grid(True)
+    axes[0, 0].set_title(title)
+    axes[-1, 0].set_xlabel("t (s)")
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def run_job(args):
+    """Ejecuta un trabajo en un worker y escribe su trayectoria (y figura)"""
+    key, job, out_dir, figures = args
+    start = time.perf_counter()
+    try:
+        t, states, columns = MODELS[job["model"]](job)
+    except Exception as error:
+        return key, {"status": "error", "error": repr(error)}
+
+    np.save(os.path.join(out_dir, f"{key}.npy"), np.column_stack((t, states)))
+    if figures:
+        save_figure(os.path.join(out_dir, f"{key}.png"), t, states, columns, job["name"])
+
+    result = {"status": "ok", "columns": ["t"] + columns, "elapsed": time.perf_counter() - start}
+    result.update(trajectory_metrics(t, states, columns))
+    return key, result
+
+
+def run_batch(jobs, out_dir, workers=None, figures=False):
+    """Ejecuta los trabajos en paralelo calculando una sola vez los idénticos"""
+    os.makedirs(out_dir, exist_ok=True)
+    for job in jobs:
+        if job["model"] not in MODELS:
+            raise ValueError(f"Modelo desconocido en {job['name']}: {job['model']}")
+
+    unique = {}
+    for job in jobs:
+        unique.setdefault(job_key(job), job)
+
+    start = time.perf_counter()
+    tasks = [(key, job, out_dir, figures) for key, job in unique.items()]
+    with multiprocessing.Pool(workers) as pool:
+        results = dict(pool.imap_unordered(run_job, tasks))
+    elapsed = time.perf_counter() - start
+
+    summary = []
+    for job in jobs:
+        key = job_key(job)
+        summary.append({"name": job["name"], "model": job["model"], "key": key,
+                        "trajectory": f"{key}.npy", **results[key]})
+
+    stats = {
+        "jobs": len(jobs),
+        "unique_jobs": len(unique),
+        "elapsed": elapsed,
+        "jobs_per_second": len(jobs) / elapsed if elapsed else float('inf'),
+        "unique_jobs_per_second": len(unique) / elapsed if elapsed else float('inf'),
+    }
+    with open(os.path.join(out_dir, "metrics.json"), "w", encoding="utf-8") as f:
+        json.dump({"stats": stats, "jobs": summary}, f, indent=2)
+    return summary, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecuta un lote de simulaciones sin interfaz gráfica")
+    parser.add_argument("jobs", help="Archivo JSON o YAML con los trabajos")
+    parser.add_argument("--out", default="batch_results", help="Carpeta de salida")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos del pool (por defecto, todos los núcleos)")
+    parser.add_argument("--figures", action="store_true", help="Guardar una figura PNG por trabajo")
+    args = parser.parse_args()
+
+    summary, stats = run_batch(load_jobs(args.jobs), args.out, args.workers, args.figures)
+
+    failed = [job["name"] for job in summary if job["status"] != "ok"]
+    print(f"Trabajos: {stats['jobs']} ({stats['unique_jobs']} únicos) en {stats['elapsed']:.2f} s")
+    print(f"Rendimiento: {stats['jobs_per_second']:.1f} trabajos/s")
+    if failed:
+        print(f"Fallidos: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
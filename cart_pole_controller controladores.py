@@ -1,6 +1,11 @@
+import os
+import sys
+
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.integrate import odeint
+from linear_propagator import LinearizedPropagator
+from figure_renderer import render_figures, comparison_figure
 
 
 class CartPoleSystem:
@@ -59,7 +64,13 @@ class CartPoleSystem:
 
         return [x_dot, theta_dot, x_ddot, theta_ddot]
 
-    def simulate(self, t_span, initial_state):
+    def simulate(self, t_span, initial_state, fast_path=False):
+        # Linear transition-matrix fast path near the upright equilibrium,
+        # falling back to odeint outside its validity envelope
+        if fast_path:
+            self.propagator = LinearizedPropagator(self)
+            return self.propagator.simulate(t_span, initial_state)
+
         t = np.linspace(0, t_span, int(t_span / 0.01))
         solution = odeint(self.system_dynamics, initial_state, t)
         return t, solution
@@ -100,6 +111,29 @@ class CartPoleSystem:
         plt.tight_layout()
         plt.show()
 
+    def figure_spec(self, t, solution, path, title='Cart-Pole System Response'):
+        # Same panels as plot_results, described for off-screen rendering
+        cart_control = (self.cart_pid['kp'] * (solution[:, 0] - self.x_ref) +
+                        self.cart_pid['kd'] * solution[:, 2])
+        pendulum_control = (self.pendulum_pid['kp'] * solution[:, 1] +
+                            self.pendulum_pid['kd'] * solution[:, 3])
+        return {
+            'path': path,
+            'title': title,
+            'figsize': (12, 10),
+            'panels': [
+                {'ylabel': 'Position (m)', 'lines': [
+                    {'x': t, 'y': solution[:, 0], 'style': 'b-', 'label': 'Cart Position'},
+                    {'x': t, 'y': np.ones_like(t) * self.x_ref, 'style': 'r--', 'label': 'Reference'}]},
+                {'ylabel': 'Angle (degrees)', 'lines': [
+                    {'x': t, 'y': np.degrees(solution[:, 1]), 'style': 'g-', 'label': 'Pendulum Angle'},
+                    {'x': t, 'y': np.degrees(np.ones_like(t) * self.theta_ref), 'style': 'r--', 'label': 'Reference'}]},
+                {'ylabel': 'Force (N)', 'lines': [
+                    {'x': t, 'y': cart_control, 'style': 'b-', 'label': 'Cart Control'},
+                    {'x': t, 'y': pendulum_control, 'style': 'g-', 'label': 'Pendulum Control'}]},
+            ],
+        }
+
 def plot_pendulum_cart_response(pendulum_pid, cart_pid, t_span=40.0, initial_state=[0.0, np.radians(30.0), 0.0, 0.0]):
     # Create system with given PID values
     system = CartPoleSystem(pendulum_pid, cart_pid)
@@ -111,7 +145,32 @@ def plot_pendulum_cart_response(pendulum_pid, cart_pid, t_span=40.0, initial_sta
     system.plot_results(t, solution)
 
 
-def main():
+def pendulum_cart_response_spec(pendulum_pid, cart_pid, t_span, initial_state, path):
+    # Runs inside a render worker: simulate and describe the figure
+    system = CartPoleSystem(dict(pendulum_pid), dict(cart_pid))
+    t, solution = system.simulate(t_span, initial_state)
+    title = (f"Pendulum kp={pendulum_pid['kp']}, ki={pendulum_pid['ki']}, kd={pendulum_pid['kd']}\n"
+             f"Cart kp={cart_pid['kp']}, ki={cart_pid['ki']}, kd={cart_pid['kd']}")
+    return system.figure_spec(t, solution, path, title)
+
+
+def render_pendulum_cart_responses(configs, output_dir, t_span=40.0,
+                                   initial_state=[0.0, np.radians(30.0), 0.0, 0.0], fmt='png', workers=None):
+    # Off-screen alternative to calling plot_pendulum_cart_response in a loop:
+    # one file per configuration plus a single comparison figure
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(pendulum_cart_response_spec,
+             (pendulum_pid, cart_pid, t_span, initial_state, os.path.join(output_dir, f'response_{i:03d}.{fmt}')))
+            for i, (pendulum_pid, cart_pid) in enumerate(configs)]
+    rendered = render_figures(jobs, workers)
+
+    # Compare pendulum angles side by side
+    runs = [{'title': preview['title'], 'lines': preview['panels'][1]['lines'][:1]} for _, preview in rendered]
+    comparison = comparison_figure(runs, os.path.join(output_dir, f'comparison.{fmt}'))
+    return [path for path, _ in rendered], comparison
+
+
+def main(output_dir=None):
     #Prueba normal
     # Set PID parameters for pendulum and cart
     cart_pid = {'kp': 1, 'ki': 0, 'kd': 1, 'integral_error': 0}
@@ -139,14 +198,27 @@ def main():
     #plot_pendulum_cart_response({'kp': 50, 'ki': 10, 'kd': 0, 'integral_error': 0}, cart_pid, t_span, initial_state)
     
     #PD (ki = 0)
-    plot_pendulum_cart_response({'kp': 100, 'ki': 0, 'kd': 1, 'integral_error': 0}, cart_pid, t_span, initial_state)
-    plot_pendulum_cart_response({'kp': 400, 'ki': 0, 'kd': 10, 'integral_error': 0}, cart_pid, t_span, initial_state)
-    plot_pendulum_cart_response({'kp': 500, 'ki': 0, 'kd': 50, 'integral_error': 0}, cart_pid, t_span, initial_state)
+    configs = [
+        ({'kp': 100, 'ki': 0, 'kd': 1, 'integral_error': 0}, cart_pid),
+        ({'kp': 400, 'ki': 0, 'kd': 10, 'integral_error': 0}, cart_pid),
+        ({'kp': 500, 'ki': 0, 'kd': 50, 'integral_error': 0}, cart_pid),
+    ]
 
     #Pruebas carro
     pendulum_pid = {'kp': 200, 'ki': 0, 'kd': 50, 'integral_error': 0}
-    plot_pendulum_cart_response(pendulum_pid, {'kp': 50, 'ki': 0, 'kd': 100, 'integral_error': 0}, t_span, initial_state)
-    plot_pendulum_cart_response(pendulum_pid, {'kp': 100, 'ki': 0, 'kd': 50, 'integral_error': 0}, t_span, initial_state)
-    plot_pendulum_cart_response(pendulum_pid, {'kp': 10, 'ki': 0, 'kd': 10, 'integral_error': 0},  t_span, initial_state)
+    configs += [
+        (pendulum_pid, {'kp': 50, 'ki': 0, 'kd': 100, 'integral_error': 0}),
+        (pendulum_pid, {'kp': 100, 'ki': 0, 'kd': 50, 'integral_error': 0}),
+        (pendulum_pid, {'kp': 10, 'ki': 0, 'kd': 10, 'integral_error': 0}),
+    ]
+
+    # With an output directory the figures are rendered off-screen in parallel
+    if output_dir is not None:
+        paths, comparison = render_pendulum_cart_responses(configs, output_dir, t_span, initial_state)
+        print(f"{len(paths)} figures and {comparison} written to {output_dir}")
+        return
+
+    for pendulum, cart in configs:
+        plot_pendulum_cart_response(dict(pendulum), dict(cart), t_span, initial_state)
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
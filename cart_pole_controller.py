@@ -1,6 +1,8 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.integrate import odeint
+from linear_propagator import LinearizedPropagator
+from trajectory import Trajectory, integrate
 
 
 class CartPoleSystem:
@@ -31,6 +33,10 @@ class CartPoleSystem:
         self.x_ref = 0.0  # Desired cart position
         self.theta_ref = 0.0  # Desired pendulum angle
 
+        # Optional GainSchedule: when set, kp/kd are interpolated online
+        # from the current angle and the system parameters
+        self.schedule = None
+
     def system_dynamics(self, state, t):
         x, theta, x_dot, theta_dot = state
 
@@ -38,6 +44,11 @@ class CartPoleSystem:
         theta_error = theta - self.theta_ref
         x_error = x - self.x_ref
 
+        # Gain-scheduled mode
+        if self.schedule is not None:
+            (self.pendulum_pid['kp'], self.pendulum_pid['kd'],
+             self.cart_pid['kp'], self.cart_pid['kd']) = self.schedule.lookup(theta, self.M, self.m, self.l)
+
         # Update integral errors
         dt = 0.01  # Small time step for integral calculation
         self.pendulum_pid['integral_error'] += theta_error * dt
@@ -55,6 +66,14 @@ class CartPoleSystem:
         # Combined control force
         F = cart_control + pendulum_control
 
+        x_ddot, theta_ddot = self.accelerations(state, F)
+
+        return [x_dot, theta_dot, x_ddot, theta_ddot]
+
+    def accelerations(self, state, F):
+        # Open-loop plant: accelerations for a given applied force
+        x, theta, x_dot, theta_dot = state
+
         # System matrices
         M = np.array([[self.M + self.m, self.m * self.l * np.cos(theta)],
                       [self.m * self.l * np.cos(theta), self.m * self.l ** 2]])
@@ -64,12 +83,20 @@ class CartPoleSystem:
 
         # Solve for accelerations
         acc = np.linalg.solve(M, C)
-        x_ddot = acc[0][0]
-        theta_ddot = acc[1][0]
+        return acc[0][0], acc[1][0]
 
-        return [x_dot, theta_dot, x_ddot, theta_ddot]
+    def simulate(self, t_span, initial_state, fast_path=False, dense=False):
+        # Linear transition-matrix fast path near the upright equilibrium,
+        # falling back to odeint outside its validity envelope
+        if fast_path:
+            self.propagator = LinearizedPropagator(self)
+            t, solution = self.propagator.simulate(t_span, initial_state)
+            return Trajectory.from_samples(t, solution) if dense else (t, solution)
+
+        # Lazy trajectory backed by the solver's dense output
+        if dense:
+            return integrate(self.system_dynamics, t_span, initial_state)
 
-    def simulate(self, t_span, initial_state):
         t = np.linspace(0, t_span, int(t_span / 0.01))
         solution = odeint(self.system_dynamics, initial_state, t)
         return t, solution
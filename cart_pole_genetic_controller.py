@@ -1,19 +1,43 @@
 import numpy as np
 from deap import base, creator, tools, algorithms
 import random
-from scipy.integrate import odeint
+from scipy.integrate import odeint, ODEintWarning
 import multiprocessing
 import array
+import math
+import warnings
+
+from instrumentation import recorder, InstrumentedMap, GenerationStats
+from results_store import ResultsStore, system_parameters
+from multi_fidelity import MultiFidelityMap
+
+
+# Objetivos de la optimización multiobjetivo y sus pesos en la fitness escalar
+OBJECTIVES = ("x_error", "theta_error", "oscillation")
+OBJECTIVE_WEIGHTS = (1.0, 10.0, 0.1)
+
+# Valor de los objetivos de una simulación inestable en NSGA-II: con inf las
+# distancias de hacinamiento serían NaN y la selección se degrada
+UNSTABLE_OBJECTIVE = 1e12
+
+
+def scalar_fitness(objectives, weights=OBJECTIVE_WEIGHTS):
+    """Fitness escalar (menor es mejor) como suma ponderada de los objetivos"""
+    return sum(w * v for w, v in zip(weights, objectives))
 
 
 # Reutilizamos la clase CartPoleSystem
 class CartPoleSystem:
-    def __init__(self, gains):
+    def __init__(self, gains, params=None):
         self.M = 1.0
         self.m = 0.1
         self.l = 0.5
         self.g = 9.81
 
+        # Parámetros físicos alternativos (M, m, l, g)
+        for name, value in (params or {}).items():
+            setattr(self, name, value)
+
         # Extraemos las ganancias del individuo
         self.pendulum_pid = {
             'kp': gains[0],
@@ -63,72 +87,336 @@ class CartPoleSystem:
         return [x_dot, theta_dot, x_ddot, theta_ddot]
 
 
-def evaluate(individual):
+def cost_dynamics(state, t, system, h):
+    """Dinámica del sistema aumentada con los tres objetivos como estados.
+
+    Los objetivos de `evaluate` suman sobre muestras separadas `h`; como
+    integral equivalen a x² / h y θ² / h para los errores y a h (ẋ² + θ̇²)
+    para las oscilaciones (diferencias entre muestras ≈ derivada · h).
+
+    Las aceleraciones se resuelven en forma cerrada (la misma solución que
+    `np.linalg.solve` en `system_dynamics`) para no crear arreglos por llamada.
+    """
+    x, theta, x_dot, theta_dot = state[:4]
+    M, m, l, g = system.M, system.m, system.l, system.g
+    ml = m * l
+
+    x_error = x - system.x_ref
+    theta_error = theta - system.theta_ref
+    F = (system.pendulum_pid['kp'] * theta_error + system.pendulum_pid['kd'] * theta_dot +
+         system.cart_pid['kp'] * x_error + system.cart_pid['kd'] * x_dot)
+
+    s = math.sin(theta)
+    c = math.cos(theta)
+    rc = F - ml * theta_dot ** 2 * s
+    rp = ml * g * s
+    det = (M + m) * ml * l - (ml * c) ** 2
+    x_ddot = (ml * l * rc - ml * c * rp) / det
+    theta_ddot = ((M + m) * rp - ml * c * rc) / det
+
+    return [x_dot, theta_dot, x_ddot, theta_ddot,
+            x_error ** 2 / h, theta_error ** 2 / h, h * (x_dot ** 2 + theta_dot ** 2)]
+
+
+def evaluate(individual, initial_angle=30.0, params=None, t_span=10.0, dt=0.01, rtol=None, atol=None,
+             cost_only=False):
+    # Función de fitness (menor es mejor): suma ponderada de los objetivos
+    terms = evaluate_objectives(individual, initial_angle, params, t_span, dt, rtol, atol, cost_only)
+    return (scalar_fitness(terms),)
+
+
+def evaluate_objectives(individual, initial_angle=30.0, params=None, t_span=10.0, dt=0.01,
+                        rtol=None, atol=None, cost_only=False):
     # Configurar sistema con las ganancias del individuo
-    system = CartPoleSystem(individual)
+    system = CartPoleSystem(individual, params)
+
+    # Parámetros de simulación (t_span = 10 s, reducido para acelerar la
+    # evaluación; horizontes, pasos y tolerancias menores sirven de niveles
+    # baratos en la evaluación multifidelidad)
+    initial_state = [0.0, np.radians(initial_angle), 0.0, 0.0]
+
+    if cost_only:
+        return cost_terms(system, initial_state, t_span, dt, rtol, atol)
 
-    # Parámetros de simulación
-    t_span = 10.0  # Reducido para acelerar la evaluación
-    initial_state = [0.0, np.radians(30.0), 0.0, 0.0]
-    t = np.linspace(0, t_span, int(t_span / 0.01))
+    t = np.linspace(0, t_span, int(t_span / dt))
 
     try:
         # Simular sistema
-        solution = odeint(system.system_dynamics, initial_state, t)
+        with recorder.phase("integrate"):
+            solution, info = odeint(system.system_dynamics, initial_state, t,
+                                    rtol=rtol, atol=atol, full_output=True)
+        recorder.record_solver(info)
 
-        # Calcular error cuadrático
-        x_error = np.sum((solution[:, 0] - system.x_ref) ** 2)
-        theta_error = np.sum((solution[:, 1] - system.theta_ref) ** 2)
+        with recorder.phase("score"):
+            # Calcular error cuadrático
+            x_error = np.sum((solution[:, 0] - system.x_ref) ** 2)
+            theta_error = np.sum((solution[:, 1] - system.theta_ref) ** 2)
 
-        # Penalizar oscilaciones excesivas
-        x_oscillation = np.sum(np.diff(solution[:, 0]) ** 2)
-        theta_oscillation = np.sum(np.diff(solution[:, 1]) ** 2)
+            # Penalizar oscilaciones excesivas
+            x_oscillation = np.sum(np.diff(solution[:, 0]) ** 2)
+            theta_oscillation = np.sum(np.diff(solution[:, 1]) ** 2)
 
-        # Función de fitness (menor es mejor)
-        fitness = x_error + 10 * theta_error + 0.1 * x_oscillation + 0.1 * theta_oscillation
+        return (x_error, theta_error, x_oscillation + theta_oscillation)
+    except:
+        return (float('inf'),) * len(OBJECTIVES)
+
+
+def evaluate_pareto(individual, **kwargs):
+    """Objetivos acotados para NSGA-II (inestable o no finito -> UNSTABLE_OBJECTIVE)"""
+    return tuple(float(v) if v < UNSTABLE_OBJECTIVE else UNSTABLE_OBJECTIVE
+                 for v in evaluate_objectives(individual, **kwargs))
+
+
+def evaluate_cost(system, initial_state, t_span=10.0, dt=0.01, rtol=None, atol=None):
+    """Fitness escalar de `cost_terms` (sin guardar la trayectoria)"""
+    return scalar_fitness(cost_terms(system, initial_state, t_span, dt, rtol, atol))
+
+
+# Puntos de control de la evaluación sólo-costo (cada 0.1 s con el horizonte
+# y el paso por defecto)
+COST_CHECKPOINTS = 100
+
+
+def cost_terms(system, initial_state, t_span=10.0, dt=0.01, rtol=None, atol=None):
+    """Objetivos sin guardar la trayectoria: a odeint sólo se le piden unos
+    pocos puntos de control (COST_CHECKPOINTS), no las muestras.
 
-        return (fitness,)
+    Los objetivos se integran como estados aumentados y los errores se
+    corrigen con la mitad de sus valores en los extremos (regla del
+    trapecio), de modo que coinciden con las sumas sobre muestras de
+    `evaluate_objectives` salvo el error de cuadratura. La memoria por
+    evaluación es constante.
+
+    Cada tramo entre puntos de control tiene el mismo presupuesto de pasos
+    (mxstep) que las muestras que abarca en la evaluación con trayectoria,
+    500 por muestra: un candidato inestable agota un tramo corto y se
+    descarta enseguida, en lugar de gastar el presupuesto del horizonte.
+    """
+    samples = int(t_span / dt)
+    checkpoints = min(COST_CHECKPOINTS, samples - 1)
+    h = t_span / (samples - 1)
+    failed = (float('inf'),) * len(OBJECTIVES)
+
+    try:
+        # Agotar el presupuesto es el descarte esperado de un candidato
+        # inestable: el aviso de odeint se silencia y se mira info['message']
+        with recorder.phase("integrate"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", ODEintWarning)
+            solution, info = odeint(cost_dynamics, list(initial_state) + [0.0, 0.0, 0.0],
+                                    np.linspace(0.0, t_span, checkpoints + 1), args=(system, h),
+                                    rtol=rtol, atol=atol, mxstep=500 * math.ceil(samples / checkpoints),
+                                    full_output=True)
+        recorder.record_solver(info)
+
+        # Sin trayectoria que inspeccionar, una integración incompleta
+        # (inestable) se descarta directamente
+        if info['message'] != 'Integration successful.':
+            return failed
+
+        final = solution[-1]
+        x_error = final[4] + 0.5 * ((initial_state[0] - system.x_ref) ** 2 + (final[0] - system.x_ref) ** 2)
+        theta_error = final[5] + 0.5 * ((initial_state[1] - system.theta_ref) ** 2 +
+                                        (final[1] - system.theta_ref) ** 2)
+        return (x_error, theta_error, final[6])
     except:
-        return (float('inf'),)
-        
-def main():
-    # Configuración del algoritmo genético
-    creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
-    creator.create("Individual", array.array, typecode='d', fitness=creator.FitnessMin)
+        return failed
 
+
+def create_types():
+    # creator.create avisa si la clase ya existe (p. ej. al optimizar varias veces)
+    if not hasattr(creator, "FitnessMin"):
+        creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+    if not hasattr(creator, "Individual"):
+        creator.create("Individual", array.array, typecode='d', fitness=creator.FitnessMin)
+    if not hasattr(creator, "FitnessPareto"):
+        creator.create("FitnessPareto", base.Fitness, weights=(-1.0,) * len(OBJECTIVES))
+    if not hasattr(creator, "IndividualPareto"):
+        creator.create("IndividualPareto", array.array, typecode='d', fitness=creator.FitnessPareto)
+
+
+def build_toolbox(map_func=map, multi_objective=False, **evaluate_kwargs):
+    create_types()
     toolbox = base.Toolbox()
-    
-    # Paralelización
-    pool = multiprocessing.Pool()
-    toolbox.register("map", pool.map)
-    
+    toolbox.register("map", map_func)
+
     # Genes: [pendulum_kp, pendulum_kd, cart_kp, cart_kd]
+    individual = creator.IndividualPareto if multi_objective else creator.Individual
     toolbox.register("attr_float", random.uniform, 0, 100)
-    toolbox.register("individual", tools.initRepeat, creator.Individual, toolbox.attr_float, n=4)
+    toolbox.register("individual", tools.initRepeat, individual, toolbox.attr_float, n=4)
     toolbox.register("population", tools.initRepeat, list, toolbox.individual)
-    
-    toolbox.register("evaluate", evaluate)
+
     toolbox.register("mate", tools.cxTwoPoint)
     toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=10, indpb=0.2)
-    toolbox.register("select", tools.selTournament, tournsize=3)
+    if multi_objective:
+        # NSGA-II con el ordenamiento no dominado logarítmico de DEAP
+        # (O(N log^(M-1) N) en lugar de O(M N²): escala a miles de individuos)
+        toolbox.register("evaluate", evaluate_pareto, **evaluate_kwargs)
+        toolbox.register("select", tools.selNSGA2, nd='log')
+    else:
+        toolbox.register("evaluate", evaluate, **evaluate_kwargs)
+        toolbox.register("select", tools.selTournament, tournsize=3)
+    return toolbox
+
+
+def optimize(initial_angle=30.0, params=None, population_size=50, ngen=20, seed=None):
+    # Corrida secuencial del AG para un ángulo inicial y parámetros dados
+    # (pensada para paralelizar por fuera, una corrida por proceso)
+    if seed is not None:
+        random.seed(seed)
+    toolbox = build_toolbox(initial_angle=initial_angle, params=params)
+    population = toolbox.population(n=population_size)
+    result, _ = algorithms.eaSimple(population, toolbox, cxpb=0.7, mutpb=0.3,
+                                    ngen=ngen, verbose=False)
+    best = tools.selBest(result, k=1)[0]
+    return list(best), float(best.fitness.values[0])
+
+
+def pareto_front(population):
+    """Primer frente no dominado de los individuos estables, sin duplicados y
+    ordenado por error del carro (vacío si ningún individuo es estable)"""
+    stable = [ind for ind in population if max(ind.fitness.values) < UNSTABLE_OBJECTIVE]
+    if not stable:
+        return []
+    front = tools.sortLogNondominated(stable, len(stable), first_front_only=True)
+    unique = {tuple(ind): ind for ind in front}
+    return sorted(unique.values(), key=lambda ind: ind.fitness.values)
+
+
+def optimize_pareto(map_func=map, population_size=200, ngen=30, seed=None, stats=None, **evaluate_kwargs):
+    """NSGA-II (mu + lambda con selNSGA2): todo el frente de Pareto en una corrida.
+
+    Cada individuo tiene los tres objetivos de OBJECTIVES; cualquier
+    compromiso entre ellos se elige después sobre el frente devuelto, sin
+    volver a optimizar. Devuelve (frente, población final, logbook).
+    """
+    if seed is not None:
+        random.seed(seed)
+    toolbox = build_toolbox(map_func, multi_objective=True, **evaluate_kwargs)
+    population = toolbox.population(n=population_size)
+    population, logbook = algorithms.eaMuPlusLambda(population, toolbox, mu=population_size,
+                                                    lambda_=population_size, cxpb=0.7, mutpb=0.3,
+                                                    ngen=ngen, stats=stats, verbose=stats is not None)
+    return pareto_front(population), population, logbook
+
+
+def select_tradeoff(objectives, weights=OBJECTIVE_WEIGHTS):
+    """Índice del punto del frente (filas de objetivos) con menor suma
+    ponderada, o None si el frente está vacío"""
+    objectives = np.asarray(objectives, dtype=float).reshape(-1, len(OBJECTIVES))
+    if not len(objectives):
+        return None
+    return int(np.argmin(objectives @ np.asarray(weights, dtype=float)))
+
+
+def main_pareto(population_size=200, ngen=30, cost_only=False):
+    workers = multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(workers)
+    map_func = InstrumentedMap(pool.map, workers)
+
+    # En el logbook se resume cada generación con la fitness escalar
+    stats = GenerationStats(key=lambda ind: (scalar_fitness(ind.fitness.values),))
+    front, population, logbook = optimize_pareto(map_func, population_size, ngen, stats=stats,
+                                                 cost_only=cost_only)
+    pool.close()
+
+    store = ResultsStore()
+    params = system_parameters(CartPoleSystem(population[0]))
+    logbook_entry, _ = store.save_optimization(logbook, population, params, objectives=OBJECTIVES,
+                                               initial_state=[0.0, np.radians(30.0), 0.0, 0.0], t_span=10.0)
+    if not front:
+        print("\nNingún candidato estable: no hay frente de Pareto que guardar")
+        return front
+    store.save_front(front, params, OBJECTIVES, run=logbook_entry["id"])
+
+    objectives = [ind.fitness.values for ind in front]
+    best = front[select_tradeoff(objectives)]
+    print(f"\nFrente de Pareto: {len(front)} conjuntos de ganancias")
+    print("Compromiso con los pesos por defecto:")
+    print(f"Péndulo: kp={best[0]:.2f}, kd={best[1]:.2f}")
+    print(f"Carro: kp={best[2]:.2f}, kd={best[3]:.2f}")
+    return front
+
+
+def saving_text(summary):
+    """Ahorro con su incertidumbre (error estándar o cota inferior)"""
+    text = f"{summary['time_saved']:.2f} s"
+    if summary['lower_bound']:
+        return f"≥ {text} (cota inferior, sin muestra de descartados)"
+    if summary['error']:
+        return f"{text} ± {summary['error']:.2f} s"
+    return text
+
+
+def main(multi_fidelity=False, levels=None, fractions=None, cost_only=False, sample_size=0):
+    # Paralelización
+    workers = multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(workers)
+    map_func = InstrumentedMap(pool.map, workers)
+
+    # Escalera de fidelidad opcional: evaluación barata para todos y
+    # completa sólo para los mejores (sample_size > 0: muestra de
+    # descartados en fidelidad completa para estimar el ahorro sin sesgo)
+    ladder = None
+    if multi_fidelity:
+        ladder = MultiFidelityMap(map_func, levels, fractions, sample_size=sample_size)
+        map_func = ladder
+
+    # Configuración del algoritmo genético (cost_only: la fitness se integra
+    # como estado aumentado, sin guardar la trayectoria)
+    toolbox = build_toolbox(map_func, cost_only=cost_only)
     
     # Algoritmo
     population = toolbox.population(n=50)
     ngen = 20
     
+    # Estadísticas de fitness más métricas del solver y de los workers
+    stats = GenerationStats()
+
     result, logbook = algorithms.eaSimple(population, toolbox, 
                                         cxpb=0.7, mutpb=0.3, 
-                                        ngen=ngen, verbose=True)
+                                        ngen=ngen, stats=stats, verbose=True)
     
     pool.close()
+
+    if ladder is not None:
+        summary = ladder.summary()
+        print()
+        for k, level in enumerate(summary['levels']):
+            print(f"Nivel {k}: {level['evaluations']} evaluaciones, {level['time']:.2f} s, "
+                  f"ahorro {saving_text(level)}")
+        print(f"Tiempo ahorrado: {saving_text(summary)}")
+
+    # Guardar logbook y población final en el almacén local
+    ResultsStore().save_optimization(logbook, result, system_parameters(CartPoleSystem(result[0])),
+                                     initial_state=[0.0, np.radians(30.0), 0.0, 0.0], t_span=10.0)
     
     # Obtener mejor individuo
     best = tools.selBest(result, k=1)[0]
     print("\nMejores ganancias encontradas:")
     print(f"Péndulo: kp={best[0]:.2f}, kd={best[1]:.2f}")
     print(f"Carro: kp={best[2]:.2f}, kd={best[3]:.2f}")
+
+    # Pulido local con gradientes exactos (sensibilidades hacia adelante)
+    from gradient_refinement import refine
+
+    gains, fitness, simulations = refine(tools.selBest(result, k=3))[0]
+    if fitness < best.fitness.values[0]:
+        print(f"\nRefinamiento por gradiente: fitness {best.fitness.values[0]:.4g} -> {fitness:.4g} "
+              f"({simulations} simulaciones)")
+        print(f"Péndulo: kp={gains[0]:.2f}, kd={gains[1]:.2f}")
+        print(f"Carro: kp={gains[2]:.2f}, kd={gains[3]:.2f}")
+        best[:] = array.array('d', gains)
+        best.fitness.values = (fitness,)
     
     return best
 
 if __name__ == "__main__":
-    best_gains = main()
+    import sys
+
+    if "--pareto" in sys.argv:
+        front = main_pareto(cost_only="--cost-only" in sys.argv)
+    else:
+        # --fidelity-samples: 2 descartados por nivel en fidelidad completa
+        best_gains = main(multi_fidelity="--multi-fidelity" in sys.argv,
+                          cost_only="--cost-only" in sys.argv,
+                          sample_size=2 if "--fidelity-samples" in sys.argv else 0)
@@ -0,0 +1,142 @@
+import math
+import multiprocessing
+import os
+
+import numpy as np
+from matplotlib.figure import Figure
+
+
+# Las figuras se construyen con la API orientada a objetos (Figure) y se
+# guardan con savefig, que elige Agg/SVG según la extensión del archivo:
+# no se abre ninguna ventana ni se toca el estado global de pyplot.
+
+
+def downsample(t, y, max_points):
+    """Reduce una curva a lo sumo a max_points puntos conservando los
+    mínimos y máximos de cada tramo, para que los picos no desaparezcan al
+    decimar."""
+    n = len(t)
+    if max_points is None or n <= max_points:
+        return t, y
+
+    # Dos puntos por tramo, contando el tramo incompleto del final, más los
+    # dos extremos
+    buckets = max(max_points // 2 - 1, 1)
+    size = -(-n // buckets)
+    usable = size * (n // size)
+    blocks = y[:usable].reshape(-1, size)
+    offsets = np.arange(len(blocks)) * size
+    idx = [np.argmin(blocks, axis=1) + offsets, np.argmax(blocks, axis=1) + offsets]
+
+    # Las muestras que no completan un tramo forman un último tramo
+    if usable < n:
+        tail = y[usable:]
+        idx.append([usable + np.argmin(tail), usable + np.argmax(tail)])
+
+    idx = np.unique(np.concatenate(idx + [[0, n - 1]]))
+    return t[idx], y[idx]
+
+
+def render_figure(spec):
+    """Dibuja una figura descrita por un diccionario y la guarda en spec['path'].
+
+    spec = {"path": "salida.png", "title": "...", "xlabel": "Tiempo (s)",
+            "figsize": (12, 10), "max_points": None,
+            "panels": [{"ylabel": "...", "lines": [{"x": t, "y": y,
+                        "style": "b-", "label": "..."}]}]}
+    """
+    panels = spec["panels"]
+    fig = Figure(figsize=spec.get("figsize", (12, 3.3 * len(panels))))
+    axes = fig.subplots(len(panels), 1, squeeze=False)[:, 0]
+
+    for ax, panel in zip(axes, panels):
+        for line in panel["lines"]:
+            x, y = downsample(np.asarray(line["x"]), np.asarray(line["y"]), spec.get("max_points"))
+            ax.plot(x, y, line.get("style", "-"), label=line.get("label"))
+        ax.grid(True)
+        ax.set_ylabel(panel.get("ylabel", ""))
+        if any(line.get("label") for line in panel["lines"]):
+            ax.legend()
+
+    if spec.get("title"):
+        axes[0].set_title(spec["title"])
+    axes[-1].set_xlabel(spec.get("xlabel", "Tiempo (s)"))
+    fig.tight_layout()
+    fig.savefig(spec["path"])
+    return spec["path"]
+
+
+def preview(spec, max_points=300):
+    """Copia de la especificación con las curvas ya decimadas"""
+    panels = []
+    for panel in spec["panels"]:
+        lines = []
+        for line in panel["lines"]:
+            x, y = downsample(np.asarray(line["x"]), np.asarray(line["y"]), max_points)
+            lines.append(dict(line, x=x, y=y))
+        panels.append(dict(panel, lines=lines))
+    return dict(spec, panels=panels)
+
+
+def _render_job(job):
+    """Ejecuta en el worker la función que genera la especificación y la dibuja"""
+    build, args, preview_points = job
+    spec = build(*args)
+    return render_figure(spec), preview(spec, preview_points)
+
+
+def render_figures(jobs, workers=None, preview_points=300):
+    """Genera y dibuja figuras en procesos separados.
+
+    Cada trabajo es una tupla (build, args) donde `build(*args)` devuelve la
+    especificación de la figura; así la simulación también se reparte entre
+    los workers. De vuelta sólo viajan la ruta del archivo y una vista previa
+    decimada, útil para componer una figura comparativa.
+    """
+    jobs = [(build, args, preview_points) for build, args in jobs]
+    if workers == 1 or len(jobs) <= 1:
+        return [_render_job(job) for job in jobs]
+    with multiprocessing.Pool(workers) as pool:
+        return pool.map(_render_job, jobs)
+
+
+def comparison_figure(runs, path, max_points=300, ncols=None, xlabel="Tiempo (s)", title=None):
+    """Compone muchas corridas en una sola figura de paneles pequeños.
+
+    runs = [{"title": "...", "lines": [{"x": t, "y": y, "style": "g-",
+             "label": "..."}]}, ...]
+    Las curvas se deciman a max_points por línea, así que el costo de
+    dibujo depende del número de paneles y no de la longitud de las
+    simulaciones.
+    """
+    n = len(runs)
+    ncols = ncols or min(n, max(1, math.ceil(math.sqrt(n))))
+    nrows = math.ceil(n / ncols)
+    fig = Figure(figsize=(3.2 * ncols, 2.4 * nrows))
+    axes = fig.subplots(nrows, ncols, squeeze=False, sharex=True)
+
+    for ax, run in zip(axes.flat, runs):
+        for line in run["lines"]:
+            x, y = downsample(np.asarray(line["x"]), np.asarray(line["y"]), max_points)
+            ax.plot(x, y, line.get("style", "-"), linewidth=0.8, label=line.get("label"))
+        # Título en posición fija y pocas marcas: el posicionamiento automático
+        # y las marcas de los ejes son lo más caro de dibujar con muchos paneles
+        ax.set_title(run.get("title", ""), fontsize=8, y=1.0)
+        ax.locator_params(nbins=3)
+        ax.tick_params(labelsize=7)
+        ax.grid(True, linewidth=0.3)
+
+    for ax in axes.flat[n:]:
+        ax.set_visible(False)
+    for ax in axes[-1]:
+        ax.set_xlabel(xlabel, fontsize=8)
+    if title:
+        fig.suptitle(title)
+
+    # Márgenes fijos: tight_layout recorre todos los ejes y domina el costo
+    # cuando hay decenas de paneles
+    fig.subplots_adjust(left=0.04, right=0.99, bottom=0.06, top=0.94 if title else 0.97,
+                        wspace=0.25, hspace=0.45)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fig.savefig(path)
+    return path
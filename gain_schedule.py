@@ -0,0 +1,134 @@
+"""Tabla de programación de ganancias precalculada.
+
+Generación (offline, en paralelo):
+    python gain_schedule.py --angles 5 15 30 45 --M 0.5 1.0 2.0 --m 0.05 0.1 0.2 \\
+        --l 0.25 0.5 1.0 --population 30 --generations 10 --out gain_schedule.npz
+
+Cada punto de la malla (ángulo inicial, M, m, l) se optimiza con el AG de
+cart_pole_genetic_controller y se guarda el mejor
+[pendulum_kp, pendulum_kd, cart_kp, cart_kd]. Luego `GainSchedule.lookup`
+interpola multilinealmente en microsegundos.
+"""
+import argparse
+import bisect
+import itertools
+import math
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+
+# Tabla por defecto junto al código
+SCHEDULE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gain_schedule.npz")
+
+AXES = ("angle", "M", "m", "l")
+
+
+class GainSchedule:
+    """Interpolación multilineal de ganancias sobre la malla (|ángulo|, M, m, l).
+
+    Fuera de la malla los valores se saturan al borde más cercano.
+    """
+
+    def __init__(self, axes, gains, fitness=None):
+        self.axes = [np.asarray(a, dtype=float) for a in axes]
+        self.gains = np.asarray(gains, dtype=float)
+        self.fitness = fitness
+
+        # Estructuras en Python puro: con 16 esquinas por celda, el costo de
+        # llamar a numpy supera al de la interpolación misma
+        self._axes = [axis.tolist() for axis in self.axes]
+        self._flat = self.gains.reshape(-1, self.gains.shape[-1]).tolist()
+        self._strides = [int(np.prod(self.gains.shape[i + 1:-1])) for i in range(len(self.axes))]
+        self._corners = list(itertools.product((0, 1), repeat=len(self.axes)))
+
+    @classmethod
+    def load(cls, path=None):
+        data = np.load(path or SCHEDULE_FILE)
+        return cls([data[name] for name in AXES], data["gains"], data["fitness"])
+
+    def save(self, path=None):
+        np.savez_compressed(path or SCHEDULE_FILE, gains=self.gains.astype(np.float32),
+                            fitness=self.fitness, **dict(zip(AXES, self.axes)))
+
+    def lookup(self, angle, M, m, l):
+        """Ganancias interpoladas; `angle` en radianes (se usa su valor absoluto)"""
+        point = (abs(math.degrees(angle)), M, m, l)
+        base = 0
+        cell = []
+        for axis, stride, value in zip(self._axes, self._strides, point):
+            if len(axis) == 1:
+                cell.append((0.0, 0))
+                continue
+            value = min(max(value, axis[0]), axis[-1])
+            j = min(bisect.bisect_right(axis, value) - 1, len(axis) - 2)
+            cell.append(((value - axis[j]) / (axis[j + 1] - axis[j]), stride))
+            base += j * stride
+
+        # Suma ponderada de las esquinas: peso = producto de (1 - f) o f por eje
+        gains = [0.0] * len(self._flat[0])
+        for corner in self._corners:
+            weight = 1.0
+            offset = base
+            for bit, (frac, stride) in zip(corner, cell):
+                if bit:
+                    weight *= frac
+                    offset += stride
+                else:
+                    weight *= 1.0 - frac
+            if weight:
+                for k, value in enumerate(self._flat[offset]):
+                    gains[k] += weight * value
+        return gains
+
+
+def _optimize_point(args):
+    from cart_pole_genetic_controller import optimize
+
+    index, angle, params, population, generations, seed = args
+    gains, fitness = optimize(angle, params, population, generations, seed)
+    return index, gains, fitness
+
+
+def build_schedule(angles, Ms, ms, ls, population=30, generations=10, workers=None, seed=0):
+    """Optimiza cada punto de la malla en paralelo (una corrida del AG por proceso)"""
+    axes = [np.asarray(sorted(a), dtype=float) for a in (angles, Ms, ms, ls)]
+    shape = tuple(len(a) for a in axes)
+    gains = np.empty(shape + (4,))
+    fitness = np.empty(shape)
+
+    tasks = [(index, axes[0][index[0]],
+              {"M": axes[1][index[1]], "m": axes[2][index[2]], "l": axes[3][index[3]]},
+              population, generations, seed + k)
+             for k, index in enumerate(np.ndindex(shape))]
+    with multiprocessing.Pool(workers) as pool:
+        for index, best, value in pool.imap_unordered(_optimize_point, tasks):
+            gains[index] = best
+            fitness[index] = value
+
+    return GainSchedule(axes, gains, fitness)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera la tabla de programación de ganancias")
+    parser.add_argument("--angles", type=float, nargs="+", default=[5, 15, 30, 45], help="Ángulos iniciales (grados)")
+    parser.add_argument("--M", type=float, nargs="+", default=[1.0])
+    parser.add_argument("--m", type=float, nargs="+", default=[0.1])
+    parser.add_argument("--l", type=float, nargs="+", default=[0.5])
+    parser.add_argument("--population", type=int, default=30)
+    parser.add_argument("--generations", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default=SCHEDULE_FILE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    schedule = build_schedule(args.angles, args.M, args.m, args.l,
+                              args.population, args.generations, args.workers)
+    schedule.save(args.out)
+    print(f"{schedule.fitness.size} puntos optimizados en {time.perf_counter() - start:.1f} s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import numpy as np
+from scipy.integrate import odeint
+from scipy.optimize import minimize
+
+from cart_pole_genetic_controller import CartPoleSystem
+
+
+# Orden de los genes: [pendulum_kp, pendulum_kd, cart_kp, cart_kd]
+# Orden del estado:   [x, theta, x_dot, theta_dot]
+
+
+def sensitivity_dynamics(y, t, system, gains):
+    """Dinámica del carro-péndulo aumentada con las sensibilidades S = d(estado)/d(ganancias).
+
+    y = [x, theta, x_dot, theta_dot, S (4x4 aplanada por filas)]
+    dS/dt = (df/d estado) S + df/d ganancias
+    """
+    x, theta, x_dot, theta_dot = y[:4]
+    S = y[4:].reshape(4, 4)
+    kt, ktd, kx, kxd = gains
+    M, m, l, g = system.M, system.m, system.l, system.g
+    ml = m * l
+
+    s = np.sin(theta)
+    c = np.cos(theta)
+
+    # Mismo control PD que CartPoleSystem (ki = 0 en el AG)
+    F = kt * (theta - system.theta_ref) + ktd * theta_dot + kx * (x - system.x_ref) + kxd * x_dot
+
+    rc = F - ml * theta_dot ** 2 * s
+    rp = ml * g * s
+    det = (M + m) * ml * l - (ml * c) ** 2
+    n1 = ml * l * rc - ml * c * rp
+    n2 = (M + m) * rp - ml * c * rc
+    x_ddot = n1 / det
+    theta_ddot = n2 / det
+
+    # Derivadas explícitas respecto de theta (sin contar la vía de F)
+    rc_theta = -ml * theta_dot ** 2 * c
+    rp_theta = ml * g * c
+    det_theta = 2 * ml ** 2 * c * s
+    n1_theta = ml * l * rc_theta - ml * (-s * rp + c * rp_theta)
+    n2_theta = (M + m) * rp_theta - ml * (-s * rc + c * rc_theta)
+    x_ddot_theta = (n1_theta * det - n1 * det_theta) / det ** 2
+    theta_ddot_theta = (n2_theta * det - n2 * det_theta) / det ** 2
+
+    # Derivadas respecto de theta_dot a través del término centrífugo
+    rc_theta_dot = -2 * ml * theta_dot * s
+    x_ddot_theta_dot = ml * l * rc_theta_dot / det
+    theta_ddot_theta_dot = -ml * c * rc_theta_dot / det
+
+    # Sensibilidad de las aceleraciones a la fuerza
+    x_ddot_F = ml * l / det
+    theta_ddot_F = -ml * c / det
+    F_state = np.array([kx, kt, kxd, ktd])
+    F_gains = np.array([theta - system.theta_ref, theta_dot, x - system.x_ref, x_dot])
+
+    jacobian = np.zeros((4, 4))
+    jacobian[0, 2] = 1.0
+    jacobian[1, 3] = 1.0
+    jacobian[2] = x_ddot_F * F_state
+    jacobian[2, 1] += x_ddot_theta
+    jacobian[2, 3] += x_ddot_theta_dot
+    jacobian[3] = theta_ddot_F * F_state
+    jacobian[3, 1] += theta_ddot_theta
+    jacobian[3, 3] += theta_ddot_theta_dot
+
+    forcing = np.zeros((4, 4))
+    forcing[2] = x_ddot_F * F_gains
+    forcing[3] = theta_ddot_F * F_gains
+
+    dS = jacobian @ S + forcing
+    return np.concatenate(([x_dot, theta_dot, x_ddot, theta_ddot], dS.ravel()))
+
+
+def fitness_and_gradient(gains, initial_angle=30.0, params=None, t_span=10.0):
+    """Fitness de `evaluate` y su gradiente exacto respecto de las 4 ganancias.
+
+    Se integra una sola vez el sistema aumentado (estado + sensibilidades) y
+    el gradiente se obtiene derivando cada término de la fitness.
+    """
+    gains = np.asarray(gains, dtype=float)
+    system = CartPoleSystem(gains, params)
+    t = np.linspace(0, t_span, int(t_span / 0.01))
+    y0 = np.zeros(20)
+    y0[:4] = [0.0, np.radians(initial_angle), 0.0, 0.0]
+
+    y = odeint(sensitivity_dynamics, y0, t, args=(system, gains))
+    if not np.all(np.isfinite(y)):
+        return float('inf'), np.zeros(4)
+
+    x = y[:, 0] - system.x_ref
+    theta = y[:, 1] - system.theta_ref
+    S = y[:, 4:].reshape(-1, 4, 4)
+    dx = np.diff(y[:, 0])
+    dtheta = np.diff(y[:, 1])
+    dS = np.diff(S, axis=0)
+
+    fitness = (np.sum(x ** 2) + 10 * np.sum(theta ** 2) +
+               0.1 * np.sum(dx ** 2) + 0.1 * np.sum(dtheta ** 2))
+    gradient = (2 * x @ S[:, 0] + 20 * theta @ S[:, 1] +
+                0.2 * dx @ dS[:, 0] + 0.2 * dtheta @ dS[:, 1])
+    return float(fitness), gradient
+
+
+def refine(individuals, initial_angle=30.0, params=None, maxiter=50, bounds=(0.0, 1000.0)):
+    """Pulido local cuasi-Newton (L-BFGS-B) desde los mejores individuos del AG.
+
+    La fitness sigue bajando al crecer las ganancias sin límite, por eso se
+    acotan a un rango realizable (`bounds`, igual para las cuatro).
+
+    Devuelve una lista de (ganancias, fitness, simulaciones) ordenada por
+    fitness; cada simulación integra estado y sensibilidades juntos.
+    """
+    results = []
+    for individual in individuals:
+        calls = [0]
+
+        def objective(gains):
+            calls[0] += 1
+            fitness, gradient = fitness_and_gradient(gains, initial_angle, params)
+            if not np.isfinite(fitness):
+                return 1e300, np.zeros(4)
+            return fitness, gradient
+
+        result = minimize(objective, np.asarray(individual, dtype=float), jac=True,
+                          method='L-BFGS-B', bounds=[bounds] * 4,
+                          options={'maxiter': maxiter})
+        results.append((result.x.tolist(), float(result.fun), calls[0]))
+
+    return sorted(results, key=lambda r: r[1])
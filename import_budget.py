@@ -0,0 +1,76 @@
+"""Presupuesto de tiempo de arranque en frío de la app de Streamlit.
+
+Uso:
+    python import_budget.py [--budget 1.0] [--history import_budget_history.jsonl]
+
+Ejecuta app.py en un proceso nuevo (modo "bare" de Streamlit, sin servidor),
+mide el tiempo hasta terminar la primera página y verifica que no se hayan
+cargado los módulos pesados que sólo deben importarse al usarse. Cada
+medición se agrega al historial para seguir la latencia en el tiempo.
+Termina con código 1 si se excede el presupuesto o se carga un módulo
+diferido.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+# Módulos que la primera página no debe importar
+DEFERRED_MODULES = ["deap", "multiprocessing.pool", "scipy.integrate", "pandas", "matplotlib.pyplot"]
+
+_PROBE = """
+import json, runpy, sys, time
+start = time.perf_counter()
+runpy.run_path({app!r}, run_name="__main__")
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed,
+                  "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def measure(app_path, repeats=3):
+    """Mejor tiempo de arranque en frío sobre varios procesos nuevos"""
+    app_path = os.path.abspath(app_path)
+    probe = _PROBE.format(app=app_path, deferred=DEFERRED_MODULES)
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", probe], cwd=os.path.dirname(app_path),
+                                capture_output=True, text=True, check=True).stdout
+        process_time = time.perf_counter() - start
+        result = json.loads(output.strip().splitlines()[-1])
+        result["process"] = process_time
+        runs.append(result)
+    return min(runs, key=lambda r: r["process"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica el presupuesto de arranque en frío de app.py")
+    parser.add_argument("--app", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"))
+    parser.add_argument("--budget", type=float, default=1.0, help="Segundos permitidos para el proceso completo")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--history", default="import_budget_history.jsonl")
+    args = parser.parse_args()
+
+    result = measure(args.app, args.repeats)
+    record = {"timestamp": time.time(), "budget": args.budget, **result}
+    with open(args.history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+    print(f"Arranque en frío: {result['process']:.3f} s (script: {result['elapsed']:.3f} s, "
+          f"presupuesto: {args.budget:.3f} s)")
+    failed = False
+    if result["loaded"]:
+        print(f"Módulos diferidos importados en la primera página: {', '.join(result['loaded'])}")
+        failed = True
+    if result["process"] > args.budget:
+        print("Presupuesto excedido")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
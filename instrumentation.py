@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+# Archivo local donde se exportan las métricas (una línea JSON por registro)
+METRICS_FILE = os.environ.get("CARTPOLE_METRICS_FILE", "metrics.jsonl")
+
+
+class MetricsRecorder:
+    """Acumulador de métricas de bajo costo para simulaciones y evaluaciones.
+
+    Cada hilo tiene su propio acumulador (ver `recorder`); los contadores
+    son sumas simples, así que pueden restarse entre dos instantáneas para
+    obtener lo ocurrido en un intervalo.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.last_step_range = None
+
+    def add(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def update(self, counters):
+        for name, value in counters.items():
+            self.add(name, value)
+
+    @contextmanager
+    def phase(self, name):
+        """Mide el tiempo de pared de una fase (integrate, score, plot, csv...)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(f"{name}_time", time.perf_counter() - start)
+
+    def record_solver(self, info):
+        """Registra el diccionario `full_output` de odeint (LSODA).
+
+        LSODA no expone los pasos rechazados; se registran las evaluaciones
+        del lado derecho, los pasos aceptados, las evaluaciones del jacobiano
+        y el rango de tamaños de paso usados. Si la integración falló, las
+        entradas posteriores a la última salida alcanzada no están
+        inicializadas y se descartan.
+        """
+        valid = _valid_outputs(info)
+        if valid < len(info['nst']):
+            self.add("solver_failures", 1)
+        self.add("solver_calls", 1)
+        if not valid:
+            return
+
+        self.add("rhs_calls", int(info['nfe'][valid - 1]))
+        self.add("steps", int(info['nst'][valid - 1]))
+        self.add("jacobian_evals", int(info['nje'][valid - 1]))
+        self.record_step_range(info['hu'][:valid])
+
+    def record_step_range(self, steps):
+        steps = steps[steps > 0]
+        if steps.size:
+            self.last_step_range = (float(steps.min()), float(steps.max()))
+
+    def snapshot(self):
+        return dict(self.counters)
+
+    def since(self, snapshot):
+        """Contadores acumulados desde una instantánea anterior"""
+        return {name: value - snapshot.get(name, 0)
+                for name, value in self.counters.items()
+                if value != snapshot.get(name, 0)}
+
+
+def _valid_outputs(info):
+    """Cantidad de salidas de odeint con contadores válidos.
+
+    Tras un fallo (p. ej. "Excess work done") el resto de los arreglos es
+    memoria sin inicializar; la parte válida es el tramo inicial en el que
+    los contadores y el tiempo alcanzado crecen de forma monótona.
+    """
+    n = len(info['nst'])
+    if info.get('message') == 'Integration successful.':
+        return n
+
+    nfe, nst, nje, tcur = info['nfe'], info['nst'], info['nje'], info['tcur']
+    valid = 0
+    for i in range(n):
+        if nst[i] <= 0 or nfe[i] <= 0 or nje[i] < 0 or not np.isfinite(tcur[i]):
+            break
+        if i and (nst[i] < nst[i - 1] or nfe[i] < nfe[i - 1] or nje[i] < nje[i - 1]
+                  or tcur[i] < tcur[i - 1]):
+            break
+        valid = i + 1
+    return valid
+
+
+class _ThreadRecorder:
+    """Acumulador por hilo detrás de un único nombre (`recorder`).
+
+    Las sesiones de Streamlit y los hilos del planificador de trabajos corren
+    en el mismo proceso; con un acumulador por hilo sus contadores no se
+    mezclan, y `scope()` da uno nuevo a cada trabajo. Cada worker del pool
+    es un proceso con su propio acumulador.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def current(self):
+        current = getattr(self._local, "recorder", None)
+        if current is None:
+            current = self._local.recorder = MetricsRecorder()
+        return current
+
+    @contextmanager
+    def scope(self):
+        """Acumulador nuevo para el hilo actual mientras dure el bloque"""
+        previous = getattr(self._local, "recorder", None)
+        self._local.recorder = MetricsRecorder()
+        try:
+            yield self._local.recorder
+        finally:
+            self._local.recorder = previous
+
+    def __getattr__(self, name):
+        return getattr(self.current(), name)
+
+
+recorder = _ThreadRecorder()
+
+
+def export(record, path=None):
+    """Agrega un registro al archivo local de métricas"""
+    with open(path or METRICS_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def simulation_record(counters, **extra):
+    record = {"kind": "simulation", "timestamp": time.time()}
+    record.update(extra)
+    record.update(counters)
+    if "min_step" not in record and recorder.last_step_range is not None:
+        record["min_step"], record["max_step"] = recorder.last_step_range
+    return record
+
+
+class _TimedCall:
+    """Envuelve la función evaluada en el pool para medir el tiempo ocupado
+    del worker y devolver los contadores que generó en ese proceso."""
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, item):
+        before = recorder.snapshot()
+        start = time.perf_counter()
+        value = self.func(item)
+        busy = time.perf_counter() - start
+        return value, busy, recorder.since(before), os.getpid()
+
+
+class InstrumentedMap:
+    """Reemplazo de `toolbox.map` que agrega al acumulador local las métricas
+    producidas por los workers y su utilización.
+
+    Con `workers=None` la capacidad disponible la registra el propio map
+    (p. ej. el planificador compartido, según la parte del pool que le tocó).
+    """
+
+    def __init__(self, map_func, workers=None):
+        self.map_func = map_func
+        self.workers = workers
+
+    def __call__(self, func, iterable):
+        start = time.perf_counter()
+        results = list(self.map_func(_TimedCall(func), iterable))
+        wall = time.perf_counter() - start
+
+        for _, busy, counters, pid in results:
+            # Con un map secuencial los contadores ya están en este proceso
+            if pid != os.getpid():
+                recorder.update(counters)
+            recorder.add("busy_time", busy)
+        recorder.add("map_time", wall)
+        if self.workers is not None:
+            recorder.add("capacity_time", wall * self.workers)
+
+        return [result[0] for result in results]
+
+
+class GenerationStats:
+    """Estadísticas para `algorithms.eaSimple` que añaden al logbook las
+    métricas del solver y de los workers de cada generación.
+
+    eaSimple llama a `compile` justo después de evaluar cada generación, así
+    que la diferencia de contadores entre dos llamadas corresponde a ella.
+    """
+
+    columns = ["rhs_calls", "steps", "integrate_time", "score_time", "utilization", "wall"]
+
+    def __init__(self, export_path=None, key=None):
+        # deap sólo se necesita cuando se optimiza
+        from deap import tools
+
+        # `key` permite resumir fitness multiobjetivo en un valor escalar
+        self.fitness = tools.Statistics(key or (lambda ind: ind.fitness.values))
+        self.fitness.register("avg", lambda values: sum(v[0] for v in values) / len(values))
+        self.fitness.register("min", lambda values: min(v[0] for v in values))
+        self.fitness.register("max", lambda values: max(v[0] for v in values))
+        self.export_path = export_path
+
+        # Encabezado del logbook que usa eaSimple
+        self.fields = self.fitness.fields + self.columns
+        self.history = []
+        self._snapshot = recorder.snapshot()
+        self._start = time.perf_counter()
+
+    def compile(self, population):
+        now = time.perf_counter()
+        counters = recorder.since(self._snapshot)
+        self._snapshot = recorder.snapshot()
+
+        record = self.fitness.compile(population)
+        record["rhs_calls"] = counters.get("rhs_calls", 0)
+        record["steps"] = counters.get("steps", 0)
+        record["integrate_time"] = round(counters.get("integrate_time", 0.0), 4)
+        record["score_time"] = round(counters.get("score_time", 0.0), 4)
+        capacity = counters.get("capacity_time", 0.0)
+        record["utilization"] = round(counters.get("busy_time", 0.0) / capacity, 3) if capacity else 0.0
+        record["wall"] = round(now - self._start, 4)
+        self._start = now
+
+        self.history.append(dict(record, gen=len(self.history)))
+        export(dict(record, kind="generation", gen=len(self.history) - 1,
+                    timestamp=time.time()), self.export_path)
+        return record
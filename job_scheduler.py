@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from instrumentation import export, recorder
+
+
+# Procesos de cómputo compartidos por todas las sesiones de la app
+WORKERS = int(os.environ.get("CARTPOLE_WORKERS", os.cpu_count() or 1))
+
+
+def request_key(kind, **spec):
+    """Hash de una solicitud: dos solicitudes iguales comparten el trabajo"""
+    payload = json.dumps({"kind": kind, **spec}, sort_keys=True, default=float)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+class Job:
+    def __init__(self, key, session, func, args, kwargs):
+        self.key = key
+        self.session = session
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.waiters = 1
+        self.submitted = time.perf_counter()
+        self.started = None
+
+
+class JobScheduler:
+    """Planificador único del proceso para los trabajos pesados de la app.
+
+    - Un solo pool de `workers` procesos para todas las sesiones (`map` e
+      `imap_unordered` se pasan a los trabajos como su pool).
+    - Como mucho `max_running` trabajos a la vez; el resto espera en colas
+      por sesión atendidas por turnos (round robin), así una sesión con
+      muchos pedidos no posterga a las demás.
+    - Una solicitud con la misma clave que otra en cola o en ejecución no
+      se vuelve a calcular: recibe el mismo `Future`.
+    - `stats()` informa profundidad de la cola y latencias recientes; cada
+      trabajo terminado se exporta al archivo de métricas.
+    - El pool atiende las tareas en orden de llegada, así que un trabajo no
+      tiene una fracción fija de él: cada `map` registra como
+      `capacity_time` del trabajo el tiempo que ocuparon sus tareas más su
+      parte del tiempo ocioso del pool (repartido entre los trabajos que lo
+      usaban). `stats()` da además la utilización global del pool.
+    """
+
+    def __init__(self, workers=None, max_running=2, history=200):
+        self.workers = workers or WORKERS
+        self.max_running = max_running
+        self._pool = None
+        self._condition = threading.Condition()
+        self._queues = OrderedDict()
+        self._inflight = {}
+        self._running = 0
+        self._waits = deque(maxlen=history)
+        self._latencies = deque(maxlen=history)
+        self._mapping = {}
+        self._share_clock = time.perf_counter()
+        self._pool_busy = 0.0
+        self._pool_capacity = 0.0
+        self.counters = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0}
+
+        for _ in range(max_running):
+            threading.Thread(target=self._dispatch, daemon=True).start()
+
+    @property
+    def pool(self):
+        # El pool se crea con el primer trabajo que lo usa
+        with self._condition:
+            if self._pool is None:
+                import multiprocessing
+
+                self._pool = multiprocessing.Pool(self.workers)
+            return self._pool
+
+    def map(self, func, iterable):
+        items = list(iterable)
+        results = [None] * len(items)
+        token = self._enter_pool()
+        try:
+            for index, value, busy in self.pool.imap_unordered(_TimedTask(func), enumerate(items)):
+                results[index] = value
+                self._task_done(token, busy)
+        finally:
+            recorder.add("capacity_time", self._leave_pool(token))
+        return results
+
+    def imap_unordered(self, func, iterable):
+        token = self._enter_pool()
+        try:
+            for _, value, busy in self.pool.imap_unordered(_TimedTask(func), enumerate(iterable)):
+                self._task_done(token, busy)
+                yield value
+        finally:
+            recorder.add("capacity_time", self._leave_pool(token))
+
+    def _advance_shares(self, busy=0.0):
+        # El tiempo ocioso del pool desde el último evento (capacidad menos lo
+        # que ocuparon las tareas que terminaron) se reparte entre las
+        # llamadas que lo están usando
+        now = time.perf_counter()
+        if self._mapping:
+            elapsed = now - self._share_clock
+            self._pool_capacity += elapsed * self.workers
+            idle = (elapsed * self.workers - busy) / len(self._mapping)
+            for share in self._mapping.values():
+                share["idle"] += idle
+        self._share_clock = now
+
+    def _enter_pool(self):
+        token = object()
+        with self._condition:
+            self._advance_shares()
+            self._mapping[token] = {"busy": 0.0, "idle": 0.0}
+        return token
+
+    def _task_done(self, token, busy):
+        with self._condition:
+            self._advance_shares(busy)
+            self._mapping[token]["busy"] += busy
+            self._pool_busy += busy
+
+    def _leave_pool(self, token):
+        """Capacidad que le tocó a la llamada: lo que ocupó más su parte del ocio"""
+        with self._condition:
+            self._advance_shares()
+            share = self._mapping.pop(token)
+            return share["busy"] + max(share["idle"], 0.0)
+
+    def submit(self, session, key, func, *args, **kwargs):
+        """Encola `func(*args, **kwargs)` para la sesión y devuelve su Future"""
+        with self._condition:
+            self.counters["submitted"] += 1
+            job = self._inflight.get(key)
+            if job is not None:
+                job.waiters += 1
+                self.counters["deduplicated"] += 1
+                return job.future
+
+            job = Job(key, session, func, args, kwargs)
+            self._inflight[key] = job
+            self._queues.setdefault(session, deque()).append(job)
+            self._condition.notify()
+            return job.future
+
+    def position(self, future):
+        """Trabajos que se atenderán antes que éste (0 si ya está en ejecución)"""
+        with self._condition:
+            order = self._round_robin_order()
+            for index, job in enumerate(order):
+                if job.future is future:
+                    return index + 1
+            return 0
+
+    def _round_robin_order(self):
+        queues = [list(q) for q in self._queues.values()]
+        order = []
+        for turn in range(max((len(q) for q in queues), default=0)):
+            order.extend(q[turn] for q in queues if turn < len(q))
+        return order
+
+    def _next_job(self):
+        # Primera sesión con trabajos pendientes; luego pasa al final del turno
+        session, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        if queue:
+            self._queues.move_to_end(session)
+        else:
+            del self._queues[session]
+        return job
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                while not self._queues:
+                    self._condition.wait()
+                job = self._next_job()
+                self._running += 1
+            job.started = time.perf_counter()
+
+            # Cada trabajo acumula sus métricas aparte de los que corren a la vez
+            with recorder.scope():
+                recorder.add("queue_wait_time", job.started - job.submitted)
+                try:
+                    job.future.set_result(job.func(*job.args, **job.kwargs))
+                    status = "completed"
+                except BaseException as error:
+                    job.future.set_exception(error)
+                    status = "failed"
+            finished = time.perf_counter()
+
+            with self._condition:
+                self._running -= 1
+                del self._inflight[job.key]
+                self.counters[status] += 1
+                self._waits.append(job.started - job.submitted)
+                self._latencies.append(finished - job.submitted)
+
+            export({"kind": "job", "timestamp": time.time(), "key": job.key,
+                    "status": status, "waiters": job.waiters,
+                    "wait": job.started - job.submitted, "run": finished - job.started})
+
+    def stats(self):
+        with self._condition:
+            waits = sorted(self._waits)
+            latencies = sorted(self._latencies)
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "using_pool": len(self._mapping),
+                "pool_utilization": round(self._pool_busy / self._pool_capacity, 3) if self._pool_capacity else None,
+                "queued": sum(len(q) for q in self._queues.values()),
+                "queued_by_session": {session[:8]: len(q) for session, q in self._queues.items()},
+                **self.counters,
+                "wait_p50": _percentile(waits, 50),
+                "wait_p95": _percentile(waits, 95),
+                "latency_p50": _percentile(latencies, 50),
+                "latency_p95": _percentile(latencies, 95),
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+
+
+class _TimedTask:
+    """Tarea del pool que devuelve también su índice y el tiempo ocupado"""
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, item):
+        index, value = item
+        start = time.perf_counter()
+        value = self.func(value)
+        return index, value, time.perf_counter() - start
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(q / 100 * len(values)))], 4)
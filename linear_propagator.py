@@ -0,0 +1,165 @@
+import numpy as np
+from scipy.integrate import odeint
+from scipy.linalg import expm
+
+from instrumentation import recorder
+
+
+class LinearizedPropagator:
+    """Propagador híbrido para el carro-péndulo con control PD.
+
+    Cerca del equilibrio vertical el lazo cerrado es prácticamente lineal, así
+    que el estado se avanza con la matriz de transición discreta
+    Phi = expm(A * dt) del sistema linealizado. Cuando el ángulo o las
+    velocidades salen de la envolvente de validez, o el error de linealización
+    supera la cota, se vuelve a integrar la dinámica no lineal con odeint.
+
+    Funciona con cualquiera de las clases CartPoleSystem del proyecto que usen
+    los diccionarios pendulum_pid/cart_pid.
+    """
+
+    def __init__(self, system, theta_max=0.2, x_dot_max=1.0, theta_dot_max=1.0,
+                 error_bound=1e-4, nonlinear_chunk=50, block_size=100, error_stride=10):
+        self.system = system
+
+        # Envolvente de validez del modelo lineal
+        self.theta_max = theta_max  # rad
+        self.x_dot_max = x_dot_max  # m/s
+        self.theta_dot_max = theta_dot_max  # rad/s
+
+        # Cota del error local por paso (diferencia de velocidades entre el
+        # modelo lineal y el no lineal acumulada en un paso)
+        self.error_bound = error_bound
+        # Cada cuántos estados se evalúa ese error dentro de un bloque
+        self.error_stride = error_stride
+
+        # Muestras integradas de forma no lineal antes de volver a probar la vía rápida
+        self.nonlinear_chunk = nonlinear_chunk
+
+        # Pasos lineales propagados antes de validar la envolvente en bloque
+        self.block_size = block_size
+
+        self._transition_cache = {}
+
+        # Estadísticas de la última simulación
+        self.fast_steps = 0
+        self.nonlinear_steps = 0
+        self.fast_path_fraction = 0.0
+
+    def closed_loop_matrix(self):
+        """Matriz A del lazo cerrado linealizado alrededor de theta = 0"""
+        s = self.system
+        kx, kxd = s.cart_pid['kp'], s.cart_pid['kd']
+        kt, ktd = s.pendulum_pid['kp'], s.pendulum_pid['kd']
+
+        mass = np.array([[s.M + s.m, s.m * s.l],
+                         [s.m * s.l, s.m * s.l ** 2]])
+        # Lado derecho linealizado: [F, m*g*l*theta] con F = K @ estado
+        forcing = np.array([[kx, kt, kxd, ktd],
+                            [0.0, s.m * s.g * s.l, 0.0, 0.0]])
+
+        A = np.zeros((4, 4))
+        A[0, 2] = 1.0
+        A[1, 3] = 1.0
+        A[2:, :] = np.linalg.solve(mass, forcing)
+        return A
+
+    def transition_matrix(self, dt):
+        key = (round(dt, 12), self.block_size, tuple(self.system.pendulum_pid[k] for k in ('kp', 'kd')),
+               tuple(self.system.cart_pid[k] for k in ('kp', 'kd')))
+        if key not in self._transition_cache:
+            A = self.closed_loop_matrix()
+            Phi = expm(A * dt)
+
+            # Potencias Phi^1 .. Phi^block_size para propagar un bloque entero
+            # con una sola multiplicación
+            powers = np.empty((self.block_size, 4, 4))
+            powers[0] = Phi
+            for j in range(1, self.block_size):
+                powers[j] = Phi @ powers[j - 1]
+            self._transition_cache[key] = (A, powers)
+        return self._transition_cache[key]
+
+    def _nonlinear_accelerations(self, states):
+        """Aceleraciones no lineales de un bloque de estados, con la propia
+        dinámica del sistema (system_dynamics)"""
+        s = self.system
+
+        # system_dynamics acumula los errores integrales en cada llamada:
+        # estas evaluaciones de prueba no deben alterarlos
+        integrals = (s.pendulum_pid['integral_error'], s.cart_pid['integral_error'])
+        try:
+            return np.array([s.system_dynamics(state, 0.0)[2:] for state in states], dtype=float)
+        finally:
+            s.pendulum_pid['integral_error'], s.cart_pid['integral_error'] = integrals
+
+    def _first_invalid(self, states, A, dt):
+        """Índice del primer estado fuera de la envolvente (o len(states))"""
+        deviation = states - self._equilibrium
+        outside = ((np.abs(deviation[:, 1]) > self.theta_max) |
+                   (np.abs(deviation[:, 2]) > self.x_dot_max) |
+                   (np.abs(deviation[:, 3]) > self.theta_dot_max))
+
+        # El error de linealización varía suavemente a lo largo de la
+        # trayectoria: se evalúa cada `error_stride` estados (y en el último)
+        # y, si una muestra lo supera, el bloque se corta tras la anterior
+        sampled = np.unique(np.r_[np.arange(0, len(states), self.error_stride), len(states) - 1])
+        linear_acc = deviation[sampled] @ A[2:, :].T
+        error = dt * np.max(np.abs(self._nonlinear_accelerations(states[sampled]) - linear_acc), axis=1)
+
+        first = int(np.argmax(outside)) if outside.any() else len(states)
+        if (error > self.error_bound).any():
+            k = int(np.argmax(error > self.error_bound))
+            first = min(first, sampled[k - 1] + 1 if k else 0)
+        return first
+
+    def simulate(self, t_span, initial_state):
+        s = self.system
+        t = np.linspace(0, t_span, int(t_span / 0.01))
+        solution = np.empty((len(t), 4))
+        solution[0] = initial_state
+
+        self.fast_steps = 0
+        self.nonlinear_steps = 0
+
+        # El término integral depende del número de llamadas a la dinámica,
+        # no del estado, así que no admite la vía lineal
+        if s.pendulum_pid['ki'] or s.cart_pid['ki']:
+            solution, info = odeint(s.system_dynamics, initial_state, t, full_output=True)
+            recorder.record_solver(info)
+            self.nonlinear_steps = len(t) - 1
+            self.fast_path_fraction = 0.0
+            return t, solution
+
+        dt = t[1] - t[0]
+        A, powers = self.transition_matrix(dt)
+        self._equilibrium = np.array([s.x_ref, s.theta_ref, 0.0, 0.0])
+
+        k = 0
+        n = len(t)
+        while k < n - 1:
+            # Vía rápida: propagar un bloque con la matriz de transición
+            if self._first_invalid(solution[k:k + 1], A, dt) == 1:
+                end = min(k + self.block_size, n - 1)
+                deviation = solution[k] - self._equilibrium
+                solution[k + 1:end + 1] = powers[:end - k] @ deviation + self._equilibrium
+
+                # Los estados propagados hasta el primero inválido se aceptan;
+                # desde ahí se recalcula con la dinámica no lineal
+                valid = self._first_invalid(solution[k + 1:end + 1], A, dt)
+                self.fast_steps += valid
+                complete = valid == end - k
+                k += valid
+                if complete:
+                    continue
+
+            # Vía no lineal sobre un tramo de la malla
+            end = min(k + self.nonlinear_chunk, n - 1)
+            segment, info = odeint(s.system_dynamics, solution[k], t[k:end + 1], full_output=True)
+            recorder.record_solver(info)
+            solution[k + 1:end + 1] = segment[1:]
+            self.nonlinear_steps += end - k
+            k = end
+
+        self.fast_path_fraction = self.fast_steps / max(n - 1, 1)
+        return t, solution
@@ -0,0 +1,191 @@
+import multiprocessing
+
+import numpy as np
+
+
+class StreamingBands:
+    """Percentiles por instante de tiempo sin guardar las realizaciones.
+
+    Cada instante mantiene un histograma de ancho fijo (más desborde inferior
+    y superior) y la media/varianza por el método de Welford, así la memoria
+    depende del número de instantes y de bins, no del número de corridas.
+    Dos acumuladores parciales se combinan con `merge`.
+    """
+
+    def __init__(self, n_times, low, high, bins=400):
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self.width = (high - low) / bins
+        self.counts = np.zeros((n_times, bins + 2), dtype=np.int64)
+        self.n = 0
+        self.mean = np.zeros(n_times)
+        self.m2 = np.zeros(n_times)
+
+    def update(self, values):
+        """Agrega un lote de realizaciones con forma (lote, n_times)"""
+        values = np.where(np.isfinite(values), values, np.inf)
+        n_times = self.counts.shape[0]
+        idx = np.floor((values - self.low) / self.width)
+        idx = np.clip(np.nan_to_num(idx, posinf=self.bins, neginf=-1), -1, self.bins).astype(np.int64) + 1
+        flat = idx + np.arange(n_times) * (self.bins + 2)
+        self.counts += np.bincount(flat.ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+
+        # Media y varianza sólo con valores finitos recortados al rango
+        clipped = np.clip(values, self.low, self.high)
+        batch = len(values)
+        batch_mean = clipped.mean(axis=0)
+        batch_m2 = ((clipped - batch_mean) ** 2).sum(axis=0)
+        self._combine(batch, batch_mean, batch_m2)
+
+    def _combine(self, n, mean, m2):
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.n * n / total
+        self.n = total
+
+    def merge(self, other):
+        self.counts += other.counts
+        self._combine(other.n, other.mean, other.m2)
+        return self
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / max(self.n - 1, 1))
+
+    def percentiles(self, qs):
+        """Percentiles (0-100) interpolados dentro del bin, forma (len(qs), n_times)"""
+        cdf = np.cumsum(self.counts, axis=1)
+        edges = self.low + self.width * np.arange(-1, self.bins + 1)
+        result = np.empty((len(qs), self.counts.shape[0]))
+        for i, q in enumerate(qs):
+            target = q / 100.0 * self.n
+            j = np.argmax(cdf >= target, axis=1)
+            before = np.where(j > 0, cdf[np.arange(len(j)), j - 1], 0)
+            inside = self.counts[np.arange(len(j)), j]
+            frac = np.where(inside > 0, (target - before) / np.maximum(inside, 1), 0.0)
+            result[i] = np.clip(edges[j] + frac * self.width, self.low, self.high)
+        return result
+
+
+def simulate_batch(gains, initial_states, rng, t_span=10.0, dt=0.01, record_every=10,
+                   sensor_noise=(0.0, 0.0, 0.0, 0.0), force_noise=0.0,
+                   params=None, failure_angle=np.pi / 2):
+    """Integra un lote de realizaciones ruidosas del carro-péndulo con control PD.
+
+    RK4 de paso fijo `dt` vectorizado sobre el lote; el control se calcula
+    cada paso con la medición ruidosa y se mantiene constante durante el paso
+    (retenedor de orden cero), igual que la perturbación de fuerza.
+    Devuelve los estados registrados cada `record_every` pasos, con forma
+    (lote, n_registros, 4), y la máscara de realizaciones fallidas.
+    """
+    p = {"M": 1.0, "m": 0.1, "l": 0.5, "g": 9.81, **(params or {})}
+    M, m, l, g = p["M"], p["m"], p["l"], p["g"]
+    ml = m * l
+    kt, ktd, kx, kxd = gains
+    K = np.array([kx, kt, kxd, ktd])
+
+    state = np.array(initial_states, dtype=float)
+    batch = len(state)
+    steps = int(round(t_span / dt))
+    recorded = np.empty((batch, steps // record_every + 1, 4))
+    recorded[:, 0] = state
+    failed = np.zeros(batch, dtype=bool)
+    noise_std = np.asarray(sensor_noise, dtype=float)
+
+    def derivatives(s, F):
+        theta, x_dot, theta_dot = s[:, 1], s[:, 2], s[:, 3]
+        sin_t = np.sin(theta)
+        cos_t = np.cos(theta)
+        rc = F - ml * theta_dot ** 2 * sin_t
+        rp = ml * g * sin_t
+        det = (M + m) * ml * l - (ml * cos_t) ** 2
+        x_ddot = (ml * l * rc - ml * cos_t * rp) / det
+        theta_ddot = ((M + m) * rp - ml * cos_t * rc) / det
+        return np.column_stack((x_dot, theta_dot, x_ddot, theta_ddot))
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        for k in range(1, steps + 1):
+            measured = state + rng.standard_normal((batch, 4)) * noise_std
+            F = measured @ K + rng.standard_normal(batch) * force_noise
+
+            k1 = derivatives(state, F)
+            k2 = derivatives(state + 0.5 * dt * k1, F)
+            k3 = derivatives(state + 0.5 * dt * k2, F)
+            k4 = derivatives(state + dt * k3, F)
+            state = state + dt / 6.0 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+            # Una realización fallida queda congelada fuera de rango
+            newly = ~np.all(np.isfinite(state), axis=1) | (np.abs(state[:, 1]) > failure_angle)
+            failed |= newly
+            state[failed] = np.inf
+
+            if k % record_every == 0:
+                recorded[:, k // record_every] = state
+
+    return recorded, failed
+
+
+def _run_batch(args):
+    (gains, size, seed, initial_mean, initial_std, x_range, theta_range, bins, options) = args
+    rng = np.random.default_rng(seed)
+    initial_states = initial_mean + rng.standard_normal((size, 4)) * initial_std
+    recorded, failed = simulate_batch(gains, initial_states, rng, **options)
+
+    n_times = recorded.shape[1]
+    x_bands = StreamingBands(n_times, -x_range, x_range, bins)
+    theta_bands = StreamingBands(n_times, -theta_range, theta_range, bins)
+    x_bands.update(recorded[:, :, 0])
+    theta_bands.update(recorded[:, :, 1])
+    return x_bands, theta_bands, int(failed.sum())
+
+
+def run_monte_carlo(gains, runs=1000, batch_size=250, workers=None, seed=0,
+                    initial_mean=(0.0, np.radians(30.0), 0.0, 0.0),
+                    initial_std=(0.0, np.radians(5.0), 0.0, 0.0),
+                    x_range=5.0, theta_range=np.pi / 2, bins=400, pool=None, **options):
+    """Análisis de robustez de unas ganancias [pendulum_kp, pendulum_kd, cart_kp, cart_kd].
+
+    Los lotes se reparten en un pool de procesos; cada uno devuelve sólo sus
+    histogramas parciales, que se combinan a medida que llegan. `options`
+    se pasa a `simulate_batch` (t_span, dt, sensor_noise, force_noise,
+    params, failure_angle, record_every). Con `pool` (cualquier objeto con
+    `imap_unordered`, p. ej. el planificador compartido de la app) no se
+    crea un pool propio.
+    """
+    sizes = [batch_size] * (runs // batch_size)
+    if runs % batch_size:
+        sizes.append(runs % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(list(gains), size, s, np.asarray(initial_mean), np.asarray(initial_std),
+              x_range, theta_range, bins, options)
+             for size, s in zip(sizes, seeds)]
+
+    x_bands = theta_bands = None
+    failures = 0
+    own_pool = pool is None
+    if own_pool:
+        pool = multiprocessing.Pool(workers)
+    try:
+        for x_part, theta_part, failed in pool.imap_unordered(_run_batch, tasks):
+            x_bands = x_part if x_bands is None else x_bands.merge(x_part)
+            theta_bands = theta_part if theta_bands is None else theta_bands.merge(theta_part)
+            failures += failed
+    finally:
+        if own_pool:
+            pool.close()
+
+    dt = options.get("dt", 0.01)
+    record_every = options.get("record_every", 10)
+    t = np.arange(x_bands.counts.shape[0]) * dt * record_every
+    return {"t": t, "x": x_bands, "theta": theta_bands,
+            "runs": runs, "failures": failures, "failure_rate": failures / runs}
+
+
+def plot_bands(ax, t, bands, scale=1.0, color='b', label=''):
+    """Dibuja mediana y bandas 5-95 % y 25-75 % de un StreamingBands"""
+    p5, p25, p50, p75, p95 = bands.percentiles([5, 25, 50, 75, 95]) * scale
+    ax.fill_between(t, p5, p95, color=color, alpha=0.15, label=f'{label} 5-95 %')
+    ax.fill_between(t, p25, p75, color=color, alpha=0.3, label=f'{label} 25-75 %')
+    ax.plot(t, p50, color=color, label=f'{label} mediana')
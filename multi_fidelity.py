@@ -0,0 +1,208 @@
+import time
+
+import numpy as np
+
+
+# Niveles de fidelidad: argumentos extra para evaluate(). El último nivel
+# vacío corresponde a la evaluación completa (10 s, dt = 0.01, tolerancias
+# por defecto de odeint).
+DEFAULT_LEVELS = [
+    {"t_span": 2.5, "dt": 0.05, "rtol": 1e-4, "atol": 1e-6},
+    {"t_span": 5.0, "dt": 0.02, "rtol": 1e-5, "atol": 1e-7},
+    {},
+]
+
+# Fracción de candidatos que pasa de cada nivel al siguiente
+DEFAULT_FRACTIONS = [0.3, 0.5]
+
+
+class _TimedLevel:
+    """Evalúa un candidato en un nivel y mide lo que costó en el worker"""
+
+    def __init__(self, func, level):
+        self.func = func
+        self.level = level
+
+    def __call__(self, individual):
+        start = time.perf_counter()
+        value = self.func(individual, **self.level)
+        return value, time.perf_counter() - start
+
+
+class MultiFidelityMap:
+    """Reemplazo de `toolbox.map` que evalúa por escalera de fidelidad.
+
+    Todos los candidatos reciben la evaluación barata; sólo la fracción
+    mejor clasificada de cada nivel se promueve al siguiente. Las fitness
+    de los candidatos no promovidos se calibran a la escala de la
+    evaluación completa con un ajuste lineal en escala logarítmica entre
+    niveles, hecho sobre los candidatos evaluados en ambos.
+
+    eaSimple sólo usa `toolbox.map` para evaluar, por lo que basta con
+    registrar este objeto como map para que todo el AG use la escalera.
+
+    Sin muestreo, el ahorro se estima con el costo completo de los
+    promovidos, que suelen ser los fáciles de integrar: es una cota
+    inferior. Con `sample_size` > 0, en cada llamada esa cantidad de
+    candidatos descartados de cada nivel se evalúa además en fidelidad
+    completa (trabajo extra) y el ahorro se estima sin sesgo, con su error
+    estándar.
+    """
+
+    def __init__(self, map_func=map, levels=None, fractions=None, min_promoted=3,
+                 sample_size=0, seed=None):
+        self.map_func = map_func
+        self.levels = levels if levels is not None else DEFAULT_LEVELS
+        self.fractions = fractions if fractions is not None else DEFAULT_FRACTIONS
+        self.min_promoted = min_promoted
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        if len(self.fractions) != len(self.levels) - 1:
+            raise ValueError("Se necesita una fracción por cada transición entre niveles")
+
+        # Estadísticas acumuladas por nivel: evaluaciones, tiempo de pared,
+        # costo sumado de las evaluaciones (en los workers), descartados en
+        # el nivel con lo que costaron hasta ahí, y muestra de descartados
+        # evaluada en fidelidad completa
+        n = len(self.levels)
+        self.evaluations = [0] * n
+        self.level_time = [0.0] * n
+        self.level_cost = [0.0] * n
+        self.dropped = [0] * n
+        self.dropped_cost = [0.0] * n
+        self.sampled = [0] * n
+        self.sampled_full_cost = [0.0] * n
+        self.sampled_full_sq = [0.0] * n
+        self.promoted_cost = 0.0
+
+    def _evaluate(self, func, k, indices, individuals, scores, costs):
+        start = time.perf_counter()
+        values = list(self.map_func(_TimedLevel(func, self.levels[k]),
+                                    [individuals[i] for i in indices]))
+        self.level_time[k] += time.perf_counter() - start
+        self.evaluations[k] += len(indices)
+        scores[k, indices] = [value[0] for value, _ in values]
+        costs[k, indices] = [cost for _, cost in values]
+        self.level_cost[k] += float(np.sum(costs[k, indices]))
+
+    def __call__(self, func, individuals):
+        individuals = list(individuals)
+        n = len(individuals)
+        last = len(self.levels) - 1
+        scores = np.full((len(self.levels), n), np.nan)
+        costs = np.zeros((len(self.levels), n))
+        active = np.arange(n)
+        samples = {}
+
+        for k in range(last):
+            self._evaluate(func, k, active, individuals, scores, costs)
+
+            # Promover la mejor fracción (las fitness no finitas quedan al final)
+            keep = max(self.min_promoted, int(np.ceil(self.fractions[k] * len(active))))
+            order = np.argsort(np.nan_to_num(scores[k, active], nan=np.inf))
+            dropped = active[order[keep:]]
+            active = np.sort(active[order[:keep]])
+
+            # Muestra de descartados que también se evalúa en fidelidad completa
+            if dropped.size and self.sample_size:
+                chosen = self.rng.choice(dropped, min(self.sample_size, dropped.size), replace=False)
+                samples[k] = chosen
+                dropped = np.setdiff1d(dropped, chosen)
+            self.dropped[k] += dropped.size
+            self.dropped_cost[k] += float(costs[:k + 1, dropped].sum())
+
+        sampled = np.concatenate(list(samples.values())).astype(int) if samples else np.array([], dtype=int)
+        full = np.union1d(active, sampled)
+        self._evaluate(func, last, full, individuals, scores, costs)
+        self.promoted_cost += float(costs[:last, full].sum())
+        for k, chosen in samples.items():
+            self.sampled[k] += chosen.size
+            self.sampled_full_cost[k] += float(costs[last, chosen].sum())
+            self.sampled_full_sq[k] += float((costs[last, chosen] ** 2).sum())
+
+        return [(value,) for value in self.calibrate(scores)]
+
+    def calibrate(self, scores):
+        """Lleva cada candidato a la escala del nivel completo"""
+        final = scores[-1].copy()
+        evaluated = np.isfinite(final)
+        best_full = np.min(final[evaluated]) if evaluated.any() else np.inf
+
+        # Del nivel más alto al más bajo: cada candidato usa su mejor nivel
+        for k in range(len(self.levels) - 2, -1, -1):
+            pending = np.isnan(final) & ~np.isnan(scores[k])
+            if not pending.any():
+                continue
+
+            both = np.isfinite(scores[k]) & np.isfinite(scores[-1]) & (scores[k] > 0) & (scores[-1] > 0)
+            estimate = np.full(pending.sum(), np.inf)
+            low = scores[k, pending]
+            ok = np.isfinite(low) & (low > 0)
+            if both.sum() >= 2:
+                slope, intercept = np.polyfit(np.log(scores[k, both]), np.log(scores[-1, both]), 1)
+                estimate[ok] = np.exp(intercept + slope * np.log(low[ok]))
+            elif both.any():
+                estimate[ok] = low[ok] * np.median(scores[-1, both] / scores[k, both])
+
+            # Un candidato no promovido nunca supera al mejor evaluado completo
+            final[pending] = np.maximum(estimate, best_full)
+
+        return np.where(np.isnan(final), np.inf, final)
+
+    def summary(self):
+        """Evaluaciones, tiempo y tiempo ahorrado por nivel.
+
+        El ahorro de un nivel es lo que habría costado evaluar en fidelidad
+        completa a los candidatos descartados en él (según la muestra de
+        descartados de ese nivel) menos lo que costaron; en el nivel
+        completo es negativo: lo gastado en niveles baratos por los
+        promovidos. Los costos se miden por evaluación en los workers y se
+        pasan a tiempo de pared con el paralelismo efectivo observado.
+
+        `error` es el error estándar del ahorro por la muestra (None si hay
+        menos de dos muestras) y `lower_bound` indica que, sin muestra, el
+        ahorro del nivel es una cota inferior.
+        """
+        last = len(self.levels) - 1
+        full_evaluations = self.evaluations[last]
+        mean_full = self.level_cost[last] / full_evaluations if full_evaluations else 0.0
+        spent_cost = sum(self.level_cost)
+        wall_per_cost = sum(self.level_time) / spent_cost if spent_cost else 0.0
+
+        levels = []
+        for k in range(len(self.levels)):
+            error = 0.0
+            lower_bound = False
+            if k < last:
+                m = self.sampled[k]
+                if m:
+                    full_each = self.sampled_full_cost[k] / m
+                    if m >= 2:
+                        variance = max(self.sampled_full_sq[k] - m * full_each ** 2, 0.0) / (m - 1)
+                        error = self.dropped[k] * np.sqrt(variance / m)
+                    else:
+                        error = None
+                else:
+                    full_each = mean_full
+                    lower_bound = self.dropped[k] > 0
+                    error = None if lower_bound else 0.0
+                saved = self.dropped[k] * full_each - self.dropped_cost[k]
+            else:
+                saved = -self.promoted_cost
+            levels.append({"evaluations": self.evaluations[k],
+                           "time": round(self.level_time[k], 4),
+                           "time_saved": round(saved * wall_per_cost, 4),
+                           "error": None if error is None else round(float(error) * wall_per_cost, 4),
+                           "lower_bound": lower_bound})
+
+        time_saved = sum(level["time_saved"] for level in levels)
+        errors = [level["error"] for level in levels]
+        return {
+            "levels": levels,
+            "evaluations": list(self.evaluations),
+            "level_time": [level["time"] for level in levels],
+            "full_fidelity_estimate": round(sum(self.level_time) + time_saved, 4),
+            "time_saved": round(time_saved, 4),
+            "error": None if None in errors else round(float(np.sqrt(sum(e ** 2 for e in errors))), 4),
+            "lower_bound": any(level["lower_bound"] for level in levels),
+        }
@@ -0,0 +1,355 @@
+"""Servidor local de la planta carro-péndulo en tiempo real (100 Hz).
+
+Uso:
+    python plant_server.py serve [--host 127.0.0.1 --port 8765 | --unix /tmp/cartpole.sock]
+    python plant_server.py demo --clients 20 --duration 5
+
+Protocolo: una línea JSON por mensaje. Cada conexión es una planta
+independiente que avanza `dt` = 0.01 s por tick de reloj real, con la fuerza
+mantenida entre comandos (retenedor de orden cero).
+
+Servidor -> cliente, en cada tick:
+    {"type": "state", "seq": k, "t": k * dt, "timestamp": <time.time()>,
+     "state": [x, theta, x_dot, theta_dot]}
+Cliente -> servidor:
+    {"type": "force", "force": F, "seq": k}   (k: estado al que responde)
+    {"type": "reset", "state": [...], "params": {"M": ..., "m": ..., "l": ..., "g": ...}}
+    {"type": "stats"}                         (responde {"type": "stats", ...})
+Un mensaje inválido se responde con {"type": "error", "message": ...} y la
+sesión continúa.
+
+Por planta se informan el jitter del lazo (despertar real menos instante
+programado), los plazos perdidos (ticks que no alcanzaron a ejecutarse en su
+período) y la latencia de ida y vuelta (publicación del estado k hasta la
+llegada de la fuerza que responde a k). Al cerrar la conexión el resumen se
+exporta al archivo de métricas.
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+
+from cart_pole_controller import CartPoleSystem
+from instrumentation import export
+
+
+DT = 0.01
+
+# Parámetros de CartPoleSystem que un cliente puede cambiar con "reset"
+PLANT_PARAMS = ("M", "m", "l", "g")
+
+
+class CartPolePlant:
+    """Sólo la planta (sin controlador): la fuerza la da el cliente.
+
+    Parámetros y dinámica son los de CartPoleSystem; la fuerza externa
+    reemplaza a la ley PD.
+    """
+
+    def __init__(self, state=None, params=None):
+        self.system = CartPoleSystem()
+        for name, value in (params or {}).items():
+            setattr(self.system, name, value)
+
+        self.state = list(state) if state is not None else [0.0, math.radians(30.0), 0.0, 0.0]
+        self.force = 0.0
+
+    def dynamics(self, state, F):
+        x_ddot, theta_ddot = self.system.accelerations(state, F)
+        return [state[2], state[3], float(x_ddot), float(theta_ddot)]
+
+    def step(self, dt=DT):
+        """Un paso RK4 con la fuerza actual constante"""
+        s = self.state
+        F = self.force
+        k1 = self.dynamics(s, F)
+        k2 = self.dynamics([a + 0.5 * dt * b for a, b in zip(s, k1)], F)
+        k3 = self.dynamics([a + 0.5 * dt * b for a, b in zip(s, k2)], F)
+        k4 = self.dynamics([a + dt * b for a, b in zip(s, k3)], F)
+        self.state = [a + dt / 6.0 * (b1 + 2 * b2 + 2 * b3 + b4)
+                      for a, b1, b2, b3, b4 in zip(s, k1, k2, k3, k4)]
+        return self.state
+
+
+def _number(value, name):
+    """Número finito o ValueError con un mensaje para el cliente"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{name} debe ser un número finito")
+    return float(value)
+
+
+def parse_reset(message):
+    """Estado y parámetros validados de un mensaje de reinicio"""
+    state = message.get("state")
+    if state is not None:
+        if not isinstance(state, list) or len(state) != 4:
+            raise ValueError("state debe ser una lista [x, theta, x_dot, theta_dot]")
+        state = [_number(value, f"state[{i}]") for i, value in enumerate(state)]
+
+    params = message.get("params") or {}
+    if not isinstance(params, dict):
+        raise ValueError("params debe ser un objeto")
+    unknown = sorted(set(params) - set(PLANT_PARAMS))
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos: {', '.join(unknown)}")
+    params = {name: _number(value, name) for name, value in params.items()}
+    if any(value <= 0 for value in params.values()):
+        raise ValueError("Los parámetros deben ser positivos")
+    return state, params
+
+
+class LoopStats:
+    """Jitter, plazos perdidos y latencia de ida y vuelta de una planta"""
+
+    def __init__(self, period=DT, history=2000):
+        self.period = period
+        self.ticks = 0
+        self.deadline_misses = 0
+        self.commands = 0
+        self.stale_commands = 0
+        self.jitter = deque(maxlen=history)
+        self.rtt = deque(maxlen=history)
+
+    def summary(self):
+        return {
+            "ticks": self.ticks,
+            "deadline_misses": self.deadline_misses,
+            "commands": self.commands,
+            "stale_commands": self.stale_commands,
+            "jitter_mean_ms": _mean_ms(self.jitter),
+            "jitter_p99_ms": _percentile_ms(self.jitter, 99),
+            "jitter_max_ms": _percentile_ms(self.jitter, 100),
+            "rtt_p50_ms": _percentile_ms(self.rtt, 50),
+            "rtt_p95_ms": _percentile_ms(self.rtt, 95),
+            "rtt_max_ms": _percentile_ms(self.rtt, 100),
+        }
+
+
+def _mean_ms(values):
+    return round(1000 * sum(values) / len(values), 3) if values else None
+
+
+def _percentile_ms(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(1000 * ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))], 3)
+
+
+class PlantSession:
+    """Una conexión: la planta, su lazo de tiempo real y el lector de comandos"""
+
+    def __init__(self, reader, writer, period=DT):
+        self.reader = reader
+        self.writer = writer
+        self.period = period
+        self.plant = CartPolePlant()
+        self.stats = LoopStats(period)
+        self.seq = 0
+        self.published = {}
+
+    async def run(self):
+        ticker = asyncio.create_task(self._tick_loop())
+        try:
+            await self._read_commands()
+        finally:
+            ticker.cancel()
+            try:
+                await ticker
+            except (asyncio.CancelledError, ConnectionError):
+                pass
+            self.writer.close()
+
+    async def _tick_loop(self):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        k = 0
+        while True:
+            k += 1
+            deadline = start + k * self.period
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            now = loop.time()
+            self.stats.jitter.append(now - deadline)
+
+            # Si el lazo se atrasó uno o más períodos, la planta se pone al
+            # día (el tiempo simulado sigue al real) y cada tick atrasado
+            # cuenta como plazo perdido
+            behind = int((now - deadline) / self.period)
+            if behind:
+                self.stats.deadline_misses += behind
+                for _ in range(behind):
+                    self.plant.step(self.period)
+                    self.seq += 1
+                k += behind
+
+            self.plant.step(self.period)
+            self.seq += 1
+            self.stats.ticks += 1 + behind
+            await self._publish()
+
+    async def _publish(self):
+        self.published[self.seq] = time.perf_counter()
+        self.published.pop(self.seq - 100, None)
+        self._send({"type": "state", "seq": self.seq, "t": round(self.seq * self.period, 6),
+                    "timestamp": time.time(), "state": self.plant.state})
+        await self.writer.drain()
+
+    def _send(self, message):
+        self.writer.write((json.dumps(message) + "\n").encode())
+
+    async def _read_commands(self):
+        while True:
+            try:
+                line = await self._readline()
+                if not line:
+                    return
+                await self._command(line)
+            except ValueError as error:
+                # JSON inválido o mensaje mal formado: se avisa y se sigue
+                self._send({"type": "error", "message": str(error)})
+                await self.writer.drain()
+
+    async def _readline(self):
+        try:
+            return await self.reader.readline()
+        except ValueError:
+            # Línea sobre el límite del lector: se descarta
+            raise ValueError("Mensaje demasiado largo")
+
+    async def _command(self, line):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            raise ValueError("El mensaje no es JSON válido")
+        if not isinstance(message, dict):
+            raise ValueError("El mensaje debe ser un objeto JSON")
+        kind = message.get("type")
+
+        if kind == "force":
+            force = _number(message.get("force"), "force")
+            seq = message.get("seq")
+            if seq is not None and (isinstance(seq, bool) or not isinstance(seq, int)):
+                raise ValueError("seq debe ser un entero")
+            self.plant.force = force
+            self.stats.commands += 1
+            sent = self.published.get(seq)
+            if sent is not None:
+                self.stats.rtt.append(time.perf_counter() - sent)
+            # Una respuesta a un estado que no es el último llegó tarde
+            if seq != self.seq:
+                self.stats.stale_commands += 1
+        elif kind == "reset":
+            self.plant = CartPolePlant(*parse_reset(message))
+        elif kind == "stats":
+            self._send({"type": "stats", **self.stats.summary()})
+            await self.writer.drain()
+        else:
+            raise ValueError(f"Tipo de mensaje desconocido: {kind!r}")
+
+
+class PlantServer:
+    """Acepta conexiones; cada una es una planta independiente"""
+
+    def __init__(self, period=DT):
+        self.period = period
+        self.sessions = 0
+        self.active = 0
+
+    async def handle(self, reader, writer):
+        self.sessions += 1
+        self.active += 1
+        session = PlantSession(reader, writer, self.period)
+        try:
+            await session.run()
+        except ConnectionError:
+            pass
+        finally:
+            self.active -= 1
+            export({"kind": "plant_session", "timestamp": time.time(),
+                    "active_sessions": self.active, **session.stats.summary()})
+
+    async def start(self, host="127.0.0.1", port=8765, unix=None):
+        if unix:
+            return await asyncio.start_unix_server(self.handle, path=unix)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def pd_client(host="127.0.0.1", port=8765, unix=None, duration=5.0,
+                    gains=(40.0, 4.0, 1.0, 1.0)):
+    """Controlador PD externo de ejemplo: responde a cada estado con una fuerza.
+
+    Devuelve el resumen que informa el servidor para esta planta.
+    """
+    if unix:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    kt, ktd, kx, kxd = gains
+    end = time.perf_counter() + duration
+
+    while time.perf_counter() < end:
+        message = json.loads(await reader.readline())
+        if message["type"] != "state":
+            continue
+        x, theta, x_dot, theta_dot = message["state"]
+        force = kt * theta + ktd * theta_dot + kx * x + kxd * x_dot
+        writer.write((json.dumps({"type": "force", "force": force, "seq": message["seq"]}) + "\n").encode())
+        await writer.drain()
+
+    writer.write(b'{"type": "stats"}\n')
+    await writer.drain()
+    while True:
+        message = json.loads(await reader.readline())
+        if message["type"] == "stats":
+            break
+    writer.close()
+    return message
+
+
+async def demo(clients=10, duration=5.0, host="127.0.0.1", port=8765, unix=None):
+    """Servidor y `clients` controladores PD concurrentes en el mismo proceso"""
+    server = PlantServer()
+    listener = await server.start(host, port, unix)
+    async with listener:
+        summaries = await asyncio.gather(*(pd_client(host, port, unix, duration)
+                                           for _ in range(clients)))
+        # Dejar que cada sesión vea el cierre y exporte su resumen
+        while server.active:
+            await asyncio.sleep(DT)
+
+    for name in ("jitter_p99_ms", "jitter_max_ms", "rtt_p50_ms", "rtt_p95_ms", "rtt_max_ms"):
+        values = [s[name] for s in summaries if s[name] is not None]
+        print(f"{name}: peor planta {max(values):.3f}" if values else f"{name}: -")
+    misses = sum(s["deadline_misses"] for s in summaries)
+    ticks = sum(s["ticks"] for s in summaries)
+    print(f"{clients} plantas, {ticks} ticks, {misses} plazos perdidos")
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planta carro-péndulo en tiempo real para controladores externos")
+    parser.add_argument("mode", choices=["serve", "demo"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="Ruta de socket Unix en lugar de TCP")
+    parser.add_argument("--clients", type=int, default=10, help="Controladores concurrentes (demo)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Segundos por controlador (demo)")
+    args = parser.parse_args()
+
+    if args.mode == "demo":
+        asyncio.run(demo(args.clients, args.duration, args.host, args.port, args.unix))
+        return
+
+    async def serve():
+        listener = await PlantServer().start(args.host, args.port, args.unix)
+        print(f"Planta en {args.unix or f'{args.host}:{args.port}'} a {1 / DT:.0f} Hz")
+        async with listener:
+            await listener.serve_forever()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
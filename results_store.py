@@ -0,0 +1,169 @@
+import json
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sólo el candado entre hilos
+    fcntl = None
+
+
+# Carpeta local del almacén de resultados
+RESULTS_DIR = os.environ.get("CARTPOLE_RESULTS_DIR", "results")
+
+# Genes de un individuo del AG, en orden
+GENE_COLUMNS = ["pendulum_kp", "pendulum_kd", "cart_kp", "cart_kd"]
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """Commit actual del repositorio (o 'unknown' fuera de git)"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# Un candado por carpeta, compartido por todas las instancias del proceso,
+# y el último id asignado junto con el tamaño del índice en ese momento
+_locks = {}
+_last_ids = {}
+_locks_guard = threading.Lock()
+
+
+def _root_lock(root):
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(root), threading.Lock())
+
+
+def system_parameters(system):
+    """Parámetros del modelo que forman parte de la clave de un resultado"""
+    return {name: float(getattr(system, name)) for name in ("M", "m", "l", "g")}
+
+
+class ResultsStore:
+    """Almacén local de trayectorias y corridas de optimización.
+
+    Todos los arreglos se agregan como float64 a un único archivo binario
+    (`data.f64`) y se leen con `np.memmap`, de modo que cargar una corrida
+    anterior no copia datos. El índice (`index.jsonl`) guarda, por cada
+    arreglo, su posición en el archivo y la clave: ganancias, estado
+    inicial, parámetros del modelo y versión del código.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or RESULTS_DIR
+        os.makedirs(self.root, exist_ok=True)
+        self.data_path = os.path.join(self.root, "data.f64")
+        self.index_path = os.path.join(self.root, "index.jsonl")
+        self.lock_path = os.path.join(self.root, ".lock")
+        self._lock = _root_lock(self.root)
+        self._memmap = None
+
+    @contextmanager
+    def _locked(self):
+        """Exclusión entre hilos (y entre procesos, donde hay fcntl)"""
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _append(self, array, entry):
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        with self._locked():
+            with open(self.data_path, "ab") as f:
+                offset = f.tell() // 8
+                array.tofile(f)
+
+            entry = dict(entry, id=self._next_id(), offset=offset, shape=list(array.shape),
+                         code_version=entry.get("code_version", code_version()),
+                         created=time.time())
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            _last_ids[self.index_path] = (os.path.getsize(self.index_path), entry["id"])
+        return entry
+
+    def _next_id(self):
+        # Contador en memoria; sólo si otro proceso agregó entradas desde la
+        # última escritura se relee la última línea del índice
+        size = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+        cached_size, last_id = _last_ids.get(self.index_path, (None, None))
+        if cached_size != size:
+            last_id = self._read_last_id(size)
+        return last_id + 1 if last_id is not None else 0
+
+    def _read_last_id(self, size):
+        if not size:
+            return None
+        with open(self.index_path, "rb") as f:
+            f.seek(max(0, size - 65536))
+            lines = [line for line in f.read().splitlines() if line.strip()]
+        return json.loads(lines[-1])["id"]
+
+    def entries(self, kind=None, **key):
+        """Entradas del índice, filtradas por tipo y por campos de la clave"""
+        if not os.path.exists(self.index_path):
+            return []
+        with open(self.index_path, encoding="utf-8") as f:
+            # Una línea sin salto final todavía se está escribiendo
+            entries = [json.loads(line) for line in f if line.endswith("\n") and line.strip()]
+        return [e for e in entries
+                if (kind is None or e["kind"] == kind)
+                and all(e.get(name) == value for name, value in key.items())]
+
+    def load(self, entry):
+        """Vista de solo lectura (sin copia) del arreglo de una entrada"""
+        size = os.path.getsize(self.data_path) // 8
+        if self._memmap is None or self._memmap.size < size:
+            self._memmap = np.memmap(self.data_path, dtype=np.float64, mode="r", shape=(size,))
+        count = int(np.prod(entry["shape"]))
+        return self._memmap[entry["offset"]:entry["offset"] + count].reshape(entry["shape"])
+
+    def save_simulation(self, t, solution, gains, initial_state, params, **meta):
+        """Guarda una trayectoria como columnas [t, x, theta, x_dot, theta_dot]"""
+        entry = dict(meta, kind="simulation",
+                     gains=[float(g) for g in gains],
+                     initial_state=[float(s) for s in initial_state],
+                     params=params,
+                     columns=["t", "x", "theta", "x_dot", "theta_dot"])
+        return self._append(np.column_stack((t, solution)), entry)
+
+    def save_optimization(self, logbook, population, params, objectives=("fitness",), **meta):
+        """Guarda el logbook y la población final de una corrida del AG.
+
+        Se crean dos entradas enlazadas por `run`: el logbook (una fila por
+        generación, columnas numéricas) y la población (genes + un valor por
+        cada objetivo de `objectives`).
+        """
+        columns = [name for name in logbook.header if name in logbook[0]]
+        table = np.array([[float(row[name]) for name in columns] for row in logbook])
+        logbook_entry = self._append(table, dict(meta, kind="logbook", params=params,
+                                                 columns=columns))
+
+        population_entry = self._append(_genes(population, objectives),
+                                        dict(meta, kind="population", params=params,
+                                             columns=GENE_COLUMNS + list(objectives),
+                                             run=logbook_entry["id"]))
+        return logbook_entry, population_entry
+
+    def save_front(self, front, params, objectives, **meta):
+        """Guarda un frente de Pareto (genes + objetivos, una fila por punto)"""
+        entry = dict(meta, kind="pareto", params=params, objectives=list(objectives),
+                     columns=GENE_COLUMNS + list(objectives))
+        return self._append(_genes(front, objectives), entry)
+
+
+def _genes(individuals, objectives):
+    return np.array([list(ind) + list(ind.fitness.values[:len(objectives)]) for ind in individuals])
@@ -0,0 +1,42 @@
+import math
+
+from deap import creator
+
+from cart_pole_genetic_controller import (evaluate, create_types, optimize_pareto, pareto_front,
+                                          select_tradeoff, OBJECTIVES, UNSTABLE_OBJECTIVE)
+
+
+# Ganancias estables [pendulum_kp, pendulum_kd, cart_kp, cart_kd]
+STABLE_GAINS = [
+    [87.5, 81.24, 18.8, 99.94],
+    [84.08, 97.62, 34.37, 47.91],
+    [97.46, 63.89, 6.58, 8.47],
+]
+
+
+def test_cost_only_matches_trajectory_fitness():
+    for gains in STABLE_GAINS:
+        fitness = evaluate(gains)[0]
+        cost = evaluate(gains, cost_only=True)[0]
+        assert math.isfinite(cost)
+        assert math.isclose(cost, fitness, rel_tol=1e-4)
+
+
+def test_pareto_front_cost_only_is_stable():
+    front, population, _ = optimize_pareto(population_size=20, ngen=2, seed=1, cost_only=True)
+    assert front
+    assert all(max(ind.fitness.values) < UNSTABLE_OBJECTIVE for ind in front)
+    assert select_tradeoff([ind.fitness.values for ind in front]) in range(len(front))
+
+
+def test_pareto_front_without_stable_candidates_is_empty():
+    create_types()
+    population = []
+    for gains in STABLE_GAINS:
+        ind = creator.IndividualPareto(gains)
+        ind.fitness.values = (UNSTABLE_OBJECTIVE,) * len(OBJECTIVES)
+        population.append(ind)
+
+    front = pareto_front(population)
+    assert front == []
+    assert select_tradeoff([ind.fitness.values for ind in front]) is None
@@ -0,0 +1,13 @@
+import os
+
+from import_budget import measure, DEFERRED_MODULES
+
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def test_import_budget():
+    result = measure(APP, repeats=3)
+    # La primera página no carga ninguno de los módulos diferidos
+    assert not set(result["loaded"]) & set(DEFERRED_MODULES)
+    assert result["process"] <= 1.0
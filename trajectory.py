@@ -0,0 +1,167 @@
+import io
+import warnings
+
+import numpy as np
+
+from instrumentation import recorder
+
+
+# Tolerancias por defecto de odeint, para que la salida densa coincida con
+# las simulaciones sobre malla fija
+RTOL = 1.49012e-8
+ATOL = 1.49012e-8
+
+STATE_LABELS = ("x", "theta", "x_dot", "theta_dot")
+
+# Límite de la integración densa: pasos aceptados por muestra de la malla
+# fija de 0.01 s. Un lado derecho no suave (p. ej. el error integral que se
+# acumula en cada evaluación) puede llevar a LSODA a pasos diminutos sin
+# terminar nunca. Depende sólo del horizonte, no de la máquina.
+STEPS_PER_SAMPLE = 5
+
+
+class _SampledSolution:
+    """Interpolante lineal sobre muestras ya calculadas (p. ej. la vía lineal)"""
+
+    def __init__(self, t, y):
+        self.ts = np.asarray(t, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+
+    def __call__(self, t):
+        t = np.atleast_1d(t)
+        return np.array([np.interp(t, self.ts, column) for column in self.y.T])
+
+
+class Trajectory:
+    """Trayectoria perezosa respaldada por el interpolante del integrador.
+
+    No guarda ninguna malla: los estados se evalúan al pedirlos, en los
+    instantes que se necesiten. `nodes` son los pasos aceptados por el
+    integrador (donde tuvo que afinar), `sample` da una malla uniforme y
+    `view` una versión decimada que conserva máximos y mínimos para graficar.
+    """
+
+    def __init__(self, solution, labels=STATE_LABELS):
+        self.solution = solution
+        self.nodes = np.asarray(solution.ts)
+        self.t_min = float(self.nodes[0])
+        self.t_max = float(self.nodes[-1])
+        self.labels = labels
+        self.rhs_evaluations = 0
+        # Si la integración se detuvo antes del final, t_max es hasta donde llegó
+        self.success = True
+        self.message = ""
+
+    @classmethod
+    def from_samples(cls, t, y, labels=STATE_LABELS):
+        return cls(_SampledSolution(t, y), labels)
+
+    @classmethod
+    def from_segments(cls, results, labels=STATE_LABELS):
+        """Une las salidas densas de varios tramos de solve_ivp consecutivos"""
+        from scipy.integrate import OdeSolution
+
+        ts = [results[0].sol.ts[:1]]
+        interpolants = []
+        for result in results:
+            # Un tramo de largo cero (evento en el instante inicial) no aporta
+            if len(result.sol.ts) < 2:
+                continue
+            ts.append(result.sol.ts[1:])
+            interpolants.extend(result.sol.interpolants)
+        return cls(OdeSolution(np.concatenate(ts), interpolants), labels)
+
+    def __call__(self, t):
+        """Estados en los instantes `t`: forma (len(t), 4), o (4,) para un escalar"""
+        states = self.solution(np.atleast_1d(np.clip(t, self.t_min, self.t_max)))
+        return states.T if np.ndim(t) else states[:, 0]
+
+    def sample(self, n=None, dt=None):
+        """Malla uniforme de `n` puntos o de paso `dt` (ambos extremos incluidos)"""
+        if n is None:
+            n = int(round((self.t_max - self.t_min) / dt)) + 1
+        t = np.linspace(self.t_min, self.t_max, n)
+        return t, self(t)
+
+    def view(self, max_points=1000, columns=(0, 1), oversample=4):
+        """Vista decimada de a lo sumo ~max_points puntos.
+
+        Se evalúa una malla `oversample` veces más fina y de cada tramo se
+        conservan los instantes de mínimo y máximo de las columnas
+        indicadas, para que los picos no desaparezcan al decimar.
+        """
+        per_bucket = 2 * len(columns)
+        buckets = max(max_points // per_bucket, 1)
+        size = oversample * per_bucket
+        t, states = self.sample(buckets * size + 1)
+
+        blocks = states[:-1, list(columns)].reshape(buckets, size, len(columns))
+        offsets = (np.arange(buckets) * size)[:, None]
+        idx = np.concatenate((np.argmin(blocks, axis=1) + offsets,
+                              np.argmax(blocks, axis=1) + offsets)).ravel()
+        idx = np.unique(np.concatenate(([0, len(t) - 1], idx)))
+        return t[idx], states[idx]
+
+    def to_csv(self, t=None, n=None, dt=None, max_points=None, header=True):
+        """CSV con tiempo y estados en los instantes pedidos (o una malla/vista)"""
+        if t is not None:
+            t = np.asarray(t, dtype=float)
+            states = self(t)
+        elif max_points is not None:
+            t, states = self.view(max_points)
+        else:
+            t, states = self.sample(n, dt)
+
+        buffer = io.StringIO()
+        np.savetxt(buffer, np.column_stack((t, states)), delimiter=",",
+                   header=",".join(("t",) + tuple(self.labels)) if header else "", comments="")
+        return buffer.getvalue()
+
+
+def integrate(dynamics, t_span, initial_state, rtol=RTOL, atol=ATOL, max_steps=None):
+    """Integra `dynamics(state, t)` (firma de odeint) con LSODA y salida densa.
+
+    Registra las métricas del solver en el acumulador y devuelve una
+    Trajectory perezosa en lugar de una malla fija. Si el integrador falla
+    o supera `max_steps` pasos, avisa como odeint
+    (con una advertencia) y devuelve la parte calculada.
+    """
+    from scipy.integrate import LSODA, OdeSolution
+
+    if max_steps is None:
+        max_steps = STEPS_PER_SAMPLE * int(t_span / 0.01)
+
+    solver = LSODA(lambda t, y: dynamics(y, t), 0.0, initial_state, t_span, rtol=rtol, atol=atol)
+    ts = [0.0]
+    interpolants = []
+    message = ""
+
+    while solver.status == 'running':
+        if len(interpolants) >= max_steps:
+            message = f"Se superaron {max_steps} pasos en t = {solver.t:.4g}"
+            break
+        failure = solver.step()
+        if solver.status == 'failed':
+            message = failure
+            break
+        ts.append(solver.t)
+        interpolants.append(solver.dense_output())
+
+    recorder.add("rhs_calls", int(solver.nfev))
+    recorder.add("steps", len(interpolants))
+    recorder.add("jacobian_evals", int(solver.njev))
+    recorder.add("solver_calls", 1)
+    recorder.record_step_range(np.diff(ts))
+
+    if interpolants:
+        trajectory = Trajectory(OdeSolution(np.array(ts), interpolants))
+    else:
+        trajectory = Trajectory.from_samples([0.0, 0.0], [initial_state, initial_state])
+    trajectory.rhs_evaluations = int(solver.nfev)
+
+    if message:
+        recorder.add("solver_failures", 1)
+        trajectory.success = False
+        trajectory.message = message
+        warnings.warn(f"Integración incompleta: {message}", RuntimeWarning)
+    return trajectory